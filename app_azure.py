@@ -90,7 +90,7 @@ def fetch_scholar_data_alternative(author_id, start_year, end_year):
         st.write("Trying alternative web scraping method...")
         
         # Construct the Google Scholar URL
-        url = f"https://scholar.google.com/citations?user={author_id}&hl=en"
+        url = f"{os.getenv('SCHOLAR_BASE_URL', 'https://scholar.google.com').rstrip('/')}/citations?user={author_id}&hl=en"
         
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -112,13 +112,12 @@ def fetch_scholar_data_alternative(author_id, start_year, end_year):
             api_url = f"http://api.scraperapi.com?api_key={scraperapi_key}&url={url}"
             response = requests.get(api_url, timeout=60)
         else:
-            # Use proxy if available
-            proxies = None
-            if proxy_manager and proxy_manager.current_proxy:
-                proxies = proxy_manager.current_proxy
+            # Use the next healthy proxy from the pool if available
+            if proxy_manager and (proxy_manager.rotation_pool or proxy_manager.current_proxy):
                 st.info("Using configured proxy for request")
-            
-            response = requests.get(url, headers=headers, proxies=proxies, timeout=30, verify=False)
+                response = proxy_manager.request(url, headers=headers, timeout=30)
+            else:
+                response = requests.get(url, headers=headers, timeout=30, verify=False)
         
         if response.status_code != 200:
             st.error(f"Failed to fetch author page. Status code: {response.status_code}")
@@ -382,6 +381,8 @@ with st.expander("🔧 Proxy Configuration"):
     
     if proxy_manager:
         st.info(f"Current proxy type: {proxy_manager.proxy_type}")
+        if proxy_manager.rotation_pool:
+            st.dataframe(proxy_manager.rotation_pool.summary(), hide_index=True)
         if st.button("Refresh Proxy"):
             st.session_state.proxy_initialized = False
             st.rerun()
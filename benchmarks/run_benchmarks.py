@@ -0,0 +1,263 @@
+#!/usr/bin/env python3
+"""
+Offline benchmarks for the Scholar parsers and the scraper
+Parser cases run on the recorded pages in benchmarks/fixtures; end-to-end
+cases scrape synthetic 1k/5k/20k-publication profiles (built from the same
+fixtures) through google_scholar_scraper.scrape_author with delays off and
+no network. Each case reports pages/s, per-page time and peak traced memory,
+and is compared with benchmarks/baseline.json.
+
+Usage:
+    python benchmarks/run_benchmarks.py
+    python benchmarks/run_benchmarks.py --only parse --repeat 50
+    python benchmarks/run_benchmarks.py --sizes 1000 5000 --check
+    python benchmarks/run_benchmarks.py --save-baseline
+    python benchmarks/run_benchmarks.py --record AUTHOR_ID   # refresh fixtures from live Scholar
+"""
+
+import argparse
+import atexit
+import contextlib
+import io
+import json
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+BASELINE_FILE = os.path.join(BENCH_DIR, "baseline.json")
+DEFAULT_SIZES = (1000, 5000, 20000)
+# End-to-end runs fetch detail pages for this publication-year window only
+E2E_START_YEAR = 2024
+E2E_END_YEAR = 2025
+
+# No sleeping, no proxy service, and history/search/usage databases in a scratch directory
+_scratch = tempfile.mkdtemp(prefix="scholar_bench_")
+atexit.register(shutil.rmtree, _scratch, ignore_errors=True)
+for name, value in {
+    "BASE_DELAY_MIN": "0", "BASE_DELAY_MAX": "0",
+    "DETAIL_DELAY_MIN": "0", "DETAIL_DELAY_MAX": "0",
+    "LOCAL_PROXY_URL": "", "USE_PROXY_BATCH": "false",
+    "CITATION_HISTORY_DB": os.path.join(_scratch, "history.db"),
+    "SEARCH_INDEX_DB": os.path.join(_scratch, "search.db"),
+    "SCRAPE_TIMING_LOG": os.path.join(_scratch, "timings.jsonl"),
+    "PROXY_USAGE_DB": os.path.join(_scratch, "usage.db"),
+}.items():
+    os.environ[name] = value
+
+import google_scholar_scraper as scraper  # noqa: E402
+from synthetic import FIXTURES_DIR, SyntheticProfile, SyntheticSession, load_fixture  # noqa: E402
+
+
+def time_parser(parse, html, repeat):
+    """Per-call timings for parse(html), plus peak traced memory of one call"""
+    parse(html)  # warm-up
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        parse(html)
+        timings.append(time.perf_counter() - started)
+
+    tracemalloc.start()
+    parse(html)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return timings, peak
+
+
+def full_tree_abstract(html):
+    """Reference: the description read after building the whole detail page, as the scraper used to"""
+    soup = scraper.BeautifulSoup(html, "html.parser")
+    abs_box = soup.select_one("#gsc_oci_descr")
+    if abs_box:
+        return abs_box.get_text(" ", strip=True)
+    for row in soup.select(".gs_scl"):
+        field = row.select_one(".gsc_oci_field")
+        value = row.select_one(".gsc_oci_value")
+        if field and value and "description" in field.get_text(" ", strip=True).lower():
+            return value.get_text(" ", strip=True)
+    return None
+
+
+def parser_cases(repeat):
+    profile = load_fixture("profile_page.html")
+    detail = load_fixture("detail_page.html")
+    detail_fields = load_fixture("detail_page_fields.html")
+    cases = {
+        "parse_author_page": (scraper.parse_author_page, profile),
+        "parse_author_page_legacy": (lambda html: scraper.parse_author_page_legacy(html, 2000, 2030), profile),
+        "parse_abstract_html": (scraper.parse_abstract_html, detail),
+        "parse_abstract_html_fields": (scraper.parse_abstract_html, detail_fields),
+        "parse_abstract_full_tree": (full_tree_abstract, detail),
+    }
+    results = {}
+    for name, (parse, html) in cases.items():
+        timings, peak = time_parser(parse, html, repeat)
+        results[name] = summarize(len(timings), sum(timings), timings, peak)
+    return results
+
+
+def run_scrape(publications, sync_mode, output_csv, trace):
+    """Scrape a synthetic profile; returns (pages served, seconds, peak bytes or None)"""
+    session = SyntheticSession(SyntheticProfile(publications))
+    if trace:
+        tracemalloc.start()
+    started = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()), contextlib.redirect_stderr(io.StringIO()):
+        scraper.scrape_author(
+            session=session,
+            author_id=session.profile.user,
+            start_year=E2E_START_YEAR,
+            end_year=E2E_END_YEAR,
+            fetch_abstracts=True,
+            output_csv=output_csv,
+            sync_mode=sync_mode,
+        )
+    elapsed = time.perf_counter() - started
+    peak = None
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    return session.pages, elapsed, peak
+
+
+def end_to_end_cases(sizes, measure_memory):
+    results = {}
+    for size in sizes:
+        for sync_mode in ("full", "delta"):
+            name = f"scrape_{size // 1000}k_{sync_mode}"
+            for db in ("CITATION_HISTORY_DB", "SEARCH_INDEX_DB"):
+                if os.path.exists(os.environ[db]):
+                    os.remove(os.environ[db])
+            with tempfile.TemporaryDirectory() as tmp:
+                output_csv = os.path.join(tmp, "results.csv")
+                if sync_mode == "delta":
+                    # Delta sync against a complete earlier run: listing pages only
+                    run_scrape(size, "full", output_csv, trace=False)
+                pages, elapsed, _ = run_scrape(size, sync_mode, output_csv, trace=False)
+                peak = None
+                if measure_memory:
+                    if sync_mode == "full":
+                        os.remove(output_csv)
+                    _, _, peak = run_scrape(size, sync_mode, output_csv, trace=True)
+            results[name] = summarize(pages, elapsed, None, peak)
+    return results
+
+
+def summarize(pages, elapsed, timings, peak):
+    result = {
+        "pages": pages,
+        "seconds": round(elapsed, 4),
+        "pages_per_s": round(pages / elapsed, 2) if elapsed else 0.0,
+        "ms_per_page": round(1000 * elapsed / pages, 3) if pages else 0.0,
+        "peak_mib": round(peak / 2 ** 20, 2) if peak is not None else None,
+    }
+    if timings and len(timings) >= 2:
+        result["p95_ms"] = round(1000 * statistics.quantiles(timings, n=20)[-1], 3)
+    return result
+
+
+def load_baseline(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding="utf-8") as fh:
+        return json.load(fh).get("cases", {})
+
+
+def print_report(results, baseline, tolerance):
+    """Print the results table; returns the names of cases slower than baseline by more than tolerance"""
+    regressions = []
+    print("=" * 96)
+    print(f"{'case':<30}{'pages':>8}{'pages/s':>11}{'ms/page':>10}{'p95 ms':>9}{'peak MiB':>10}  vs baseline")
+    print("-" * 96)
+    for name, res in results.items():
+        base = baseline.get(name)
+        change = ""
+        if base and base.get("ms_per_page"):
+            ratio = res["ms_per_page"] / base["ms_per_page"] - 1
+            change = f"{ratio:+.0%} time"
+            if base.get("peak_mib") and res["peak_mib"] is not None:
+                change += f", {res['peak_mib'] / base['peak_mib'] - 1:+.0%} mem"
+            if ratio > tolerance:
+                change += "  SLOWER"
+                regressions.append(name)
+        p95 = f"{res['p95_ms']:.2f}" if "p95_ms" in res else "-"
+        peak = f"{res['peak_mib']:.2f}" if res["peak_mib"] is not None else "-"
+        print(f"{name:<30}{res['pages']:>8}{res['pages_per_s']:>11.1f}{res['ms_per_page']:>10.2f}{p95:>9}{peak:>10}  {change}")
+    print("=" * 96)
+    return regressions
+
+
+def record_fixtures(author_id):
+    """Replace the profile and detail fixtures with pages fetched from Scholar"""
+    session = scraper.make_session(scraper.DECODO_USERNAME, scraper.DECODO_PASSWORD)
+    res = scraper.get_with_retry(
+        session, f"{scraper.BASE_URL}/citations",
+        params={"user": author_id, "hl": "en", "cstart": 0, "pagesize": 100}, label="profile page",
+    )
+    _, rows = scraper.parse_author_page(res.text)
+    if not rows:
+        raise SystemExit("Profile page has no publications; not recording it")
+    with open(os.path.join(FIXTURES_DIR, "profile_page.html"), "w", encoding="utf-8") as fh:
+        fh.write(res.text)
+
+    for row in rows:
+        detail = scraper.get_with_retry(session, row["Scholar URL"], label="detail page")
+        if 'id="gsc_oci_descr"' in detail.text:
+            with open(os.path.join(FIXTURES_DIR, "detail_page.html"), "w", encoding="utf-8") as fh:
+                fh.write(detail.text)
+            break
+        scraper.ghum(scraper.DETAIL_DELAY_MIN, scraper.DETAIL_DELAY_MAX)
+    print(f"Recorded fixtures for {author_id} in {FIXTURES_DIR}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", choices=("parse", "scrape"), help="Run only the parser or end-to-end cases")
+    parser.add_argument("--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES),
+                        help="Synthetic profile sizes for end-to-end cases")
+    parser.add_argument("--repeat", type=int, default=30, help="Parses per parser case")
+    parser.add_argument("--no-memory", action="store_true", help="Skip the traced-memory pass of end-to-end cases")
+    parser.add_argument("--baseline", default=BASELINE_FILE)
+    parser.add_argument("--tolerance", type=float, default=0.15, help="Allowed slowdown before a case is flagged")
+    parser.add_argument("--save-baseline", action="store_true", help="Write these results as the new baseline")
+    parser.add_argument("--check", action="store_true", help="Exit 1 if any case is flagged slower")
+    parser.add_argument("--json", help="Also write the results to this file")
+    parser.add_argument("--record", metavar="AUTHOR_ID", help="Record fresh fixtures from Scholar and exit")
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixtures(args.record)
+        return
+
+    results = {}
+    if args.only != "scrape":
+        results.update(parser_cases(args.repeat))
+    if args.only != "parse":
+        results.update(end_to_end_cases(args.sizes, not args.no_memory))
+
+    regressions = print_report(results, load_baseline(args.baseline), args.tolerance)
+
+    report = {"python": sys.version.split()[0], "cases": results}
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+    if args.save_baseline:
+        merged = load_baseline(args.baseline)
+        merged.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as fh:
+            json.dump({**report, "cases": merged}, fh, indent=2)
+        print(f"Baseline written to {args.baseline}")
+    if args.check and regressions:
+        print(f"Slower than baseline: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
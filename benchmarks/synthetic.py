@@ -0,0 +1,136 @@
+"""
+Synthetic Scholar profiles built from the recorded fixtures
+The recorded listing row and detail page are used as templates, so generated
+pages carry the same markup (and page weight) as the real ones; only titles,
+authors, years, citation counts and abstracts vary.
+"""
+
+import html
+import json
+import os
+import random
+import re
+
+import requests
+
+FIXTURES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures")
+PAGE_SIZE = 100
+SYNTHETIC_USER = "SYNTHaaaAAAJ"
+FIRST_YEAR = 1990
+LAST_YEAR = 2025
+
+WORDS = (
+    "learning neural graph network transformer attention federated privacy diffusion model protein vision "
+    "language robust optimization sparse causal inference quantum reinforcement multimodal retrieval generative "
+    "adversarial contrastive representation benchmark scalable efficient hierarchical bayesian uncertainty "
+    "segmentation detection medical imaging clinical survival genomic single cell temporal spatial recurrent "
+    "memory kernel stochastic gradient convergence theory analysis"
+).split()
+SURNAMES = "Smith Chen Wang Kumar Garcia Müller Rossi Tanaka Kim Nguyen Silva Cohen Novak Ahmed Okafor".split()
+
+ROW_RE = re.compile(r'<tr class="gsc_a_tr">.*?</tr>', re.S)
+DESCR_RE = re.compile(r'(<div class="gsh_csp">)(.*?)(</div>)', re.S)
+
+
+def load_fixture(name):
+    with open(os.path.join(FIXTURES_DIR, name), encoding="utf-8") as fh:
+        return fh.read()
+
+
+def split_listing(page):
+    """(head, first_row, tail) of a recorded listing page"""
+    rows = list(ROW_RE.finditer(page))
+    if not rows:
+        raise ValueError("listing fixture has no tr.gsc_a_tr rows")
+    return page[:rows[0].start()], rows[0].group(0), page[rows[-1].end():]
+
+
+def render_row(template, title, authors, year, citations, cid, user=SYNTHETIC_USER):
+    row = re.sub(r'(class="gsc_a_at">).*?(</a>)', lambda m: m.group(1) + html.escape(title) + m.group(2), template)
+    row = re.sub(r'(<div class="gs_gray">).*?(</div>)', lambda m: m.group(1) + html.escape(authors) + m.group(2), row, count=1)
+    row = re.sub(r"citation_for_view=[^:\"&]+:[\w-]+", f"citation_for_view={user}:{cid}", row)
+    row = re.sub(r"user=[\w-]+", f"user={user}", row)
+    row = re.sub(r'(class="gsc_a_ac gs_ibl">)\d*(</a>)', lambda m: f"{m.group(1)}{citations or ''}{m.group(2)}", row)
+    return re.sub(r"\b(19|20)\d\d\b", str(year), row)
+
+
+class SyntheticProfile:
+    """A profile with n publications, newest first, served as 100-row listing pages"""
+
+    def __init__(self, publications, seed=0, user=SYNTHETIC_USER):
+        rng = random.Random(seed)
+        self.user = user
+        self.head, self.row_template, self.tail = split_listing(load_fixture("profile_page.html"))
+        self.detail_template = load_fixture("detail_page.html")
+        self.pubs = []
+        for i in range(publications):
+            self.pubs.append({
+                "title": " ".join(rng.choices(WORDS, k=rng.randint(5, 12))).capitalize() + f" {i}",
+                "authors": ", ".join(
+                    f"{rng.choice('ABCDEFGHJKLMNPRST')} {rng.choice(SURNAMES)}" for _ in range(rng.randint(2, 7))
+                ),
+                "year": rng.randint(FIRST_YEAR, LAST_YEAR),
+                "citations": int(rng.paretovariate(1.2)) - 1,
+                "cid": f"s{i:011d}",
+                "abstract_seed": rng.random(),
+            })
+        self.pubs.sort(key=lambda pub: -pub["year"])
+        self.by_cid = {pub["cid"]: pub for pub in self.pubs}
+
+    @property
+    def page_count(self):
+        return max(1, -(-len(self.pubs) // PAGE_SIZE))
+
+    def listing_rows(self, cstart, pagesize=PAGE_SIZE):
+        """Just the tr.gsc_a_tr rows, as the "Show more" (json=1) response carries them"""
+        return "".join(
+            render_row(self.row_template, p["title"], p["authors"], p["year"], p["citations"], p["cid"], self.user)
+            for p in self.pubs[cstart:cstart + pagesize]
+        )
+
+    def listing_page(self, cstart, pagesize=PAGE_SIZE):
+        return self.head + self.listing_rows(cstart, pagesize) + self.tail
+
+    def detail_page(self, cid):
+        pub = self.by_cid.get(cid)
+        if pub is None:
+            return None
+        rng = random.Random(pub["abstract_seed"])
+        abstract = html.escape(" ".join(rng.choices(WORDS, k=rng.randint(120, 260))).capitalize() + ".")
+        return DESCR_RE.sub(lambda m: m.group(1) + abstract + m.group(3), self.detail_template, count=1)
+
+
+def make_response(url, body, status=200):
+    res = requests.Response()
+    res.status_code = status
+    res.url = url
+    res.encoding = "utf-8"
+    res._content = body.encode("utf-8")
+    res._content_consumed = True  # so iter_content() serves the body like a streamed read
+    return res
+
+
+class SyntheticSession:
+    """Stands in for requests.Session: serves a SyntheticProfile and counts pages"""
+
+    def __init__(self, profile):
+        self.profile = profile
+        self.pages = 0
+
+    def get(self, url, params=None, timeout=None, **kwargs):
+        self.pages += 1
+        params = dict(params or {})
+        params.update(dict(re.findall(r"[?&]([^=&]+)=([^&]*)", url)))
+        if params.get("view_op") == "view_citation":
+            body = self.profile.detail_page(params.get("citation_for_view", "").split(":")[-1])
+            return make_response(url, body) if body else make_response(url, "", status=404)
+        cstart = int(params.get("cstart", 0))
+        return make_response(url, self.profile.listing_page(cstart, int(params.get("pagesize", PAGE_SIZE))))
+
+    def post(self, url, params=None, data=None, timeout=None, **kwargs):
+        """The "Show more" request: listing rows as JSON"""
+        self.pages += 1
+        params = dict(params or {})
+        params.update(dict(re.findall(r"[?&]([^=&]+)=([^&]*)", url)))
+        rows = self.profile.listing_rows(int(params.get("cstart", 0)), int(params.get("pagesize", PAGE_SIZE)))
+        return make_response(url, json.dumps({"B": rows}))
@@ -0,0 +1,214 @@
+"""
+Citation-count history for scraped publications
+Each refresh records a snapshot into a small SQLite database. Counts are
+delta-encoded: a point is stored only when a publication's count changes,
+keyed by Scholar citation ID, so daily refreshes of a quiet profile add
+almost nothing. Growth queries are index range scans, not snapshot scans.
+
+Usage:
+    python citation_history.py AUTHOR_ID --days 30
+"""
+
+import argparse
+import os
+import sqlite3
+from datetime import datetime, timedelta
+
+from publication_keys import citation_id, citation_owner
+
+CITATION_HISTORY_DB = os.getenv("CITATION_HISTORY_DB", "citation_history.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS publications (
+    cid TEXT PRIMARY KEY,
+    author_id TEXT NOT NULL,
+    title TEXT,
+    last_count INTEGER NOT NULL,
+    last_seen TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS snapshots (
+    author_id TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    publications INTEGER NOT NULL,
+    changed INTEGER NOT NULL,
+    PRIMARY KEY (author_id, taken_at)
+) WITHOUT ROWID;
+-- One row per change: the new count and the change since the previous point
+CREATE TABLE IF NOT EXISTS citation_points (
+    cid TEXT NOT NULL,
+    taken_at TEXT NOT NULL,
+    author_id TEXT NOT NULL,
+    count INTEGER NOT NULL,
+    delta INTEGER NOT NULL,
+    PRIMARY KEY (cid, taken_at)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS citation_points_author ON citation_points (author_id, taken_at);
+"""
+
+
+# Growth of :cid over (:start, :end]; baseline is the count at :start, else the first count in the window
+GAINED_SQL = """
+(SELECT count FROM citation_points WHERE cid = :cid AND taken_at <= :end ORDER BY taken_at DESC LIMIT 1)
+- COALESCE(
+    (SELECT count FROM citation_points WHERE cid = :cid AND taken_at <= :start ORDER BY taken_at DESC LIMIT 1),
+    (SELECT count FROM citation_points WHERE cid = :cid AND taken_at > :start ORDER BY taken_at LIMIT 1)
+)
+"""
+
+
+def to_timestamp(value):
+    """ISO timestamp string for a datetime, date or 'YYYY-MM-DD' string"""
+    if value is None:
+        return datetime.now().isoformat(timespec="seconds")
+    if isinstance(value, str):
+        return value if "T" in value else f"{value}T00:00:00"
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="seconds")
+    return f"{value.isoformat()}T00:00:00"
+
+
+class CitationHistory:
+    def __init__(self, path=CITATION_HISTORY_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def record_snapshot(self, author_id, rows, taken_at=None):
+        """
+        Record the citation counts of scraped rows (dicts with "Citation ID" or
+        "Scholar URL", "Title", "Citation Count"). Rows listed under another
+        profile, and publications already recorded for another author, are
+        skipped. Returns how many changed.
+        """
+        taken_at = to_timestamp(taken_at)
+        known = dict(self.conn.execute(
+            "SELECT cid, last_count FROM publications WHERE author_id = ?", (author_id,)
+        ))
+        changed = 0
+        seen = 0
+        with self.conn:
+            for row in rows:
+                cid = row.get("Citation ID") or citation_id(row.get("Scholar URL"))
+                if not cid or citation_owner(cid) != author_id:
+                    continue
+                try:
+                    count = int(row.get("Citation Count") or 0)
+                except (TypeError, ValueError):
+                    continue
+
+                previous = known.get(cid)
+                if previous is None and not self.conn.execute(
+                    "INSERT OR IGNORE INTO publications VALUES (?, ?, ?, ?, ?)",
+                    (cid, author_id, row.get("Title"), count, taken_at),
+                ).rowcount:
+                    # Already recorded for another author; its history is not this author's to change
+                    continue
+                seen += 1
+
+                if previous == count:
+                    self.conn.execute("UPDATE publications SET last_seen = ? WHERE cid = ?", (taken_at, cid))
+                    continue
+                if previous is not None:
+                    self.conn.execute(
+                        "UPDATE publications SET last_count = ?, last_seen = ? WHERE cid = ?",
+                        (count, taken_at, cid),
+                    )
+
+                known[cid] = count
+                changed += 1
+                self.conn.execute(
+                    "INSERT OR REPLACE INTO citation_points VALUES (?, ?, ?, ?, ?)",
+                    # A publication's first point is its baseline, not a gain
+                    (cid, taken_at, author_id, count, 0 if previous is None else count - previous),
+                )
+            self.conn.execute(
+                "INSERT OR REPLACE INTO snapshots VALUES (?, ?, ?, ?)",
+                (author_id, taken_at, seen, changed),
+            )
+        return changed
+
+    def count_at(self, cid, when):
+        """Citation count as of `when` (last change at or before it), or None"""
+        row = self.conn.execute(
+            "SELECT count FROM citation_points WHERE cid = ? AND taken_at <= ? ORDER BY taken_at DESC LIMIT 1",
+            (cid, to_timestamp(when)),
+        ).fetchone()
+        return row[0] if row else None
+
+    def series(self, cid):
+        """[(taken_at, count)] change points for one publication"""
+        return self.conn.execute(
+            "SELECT taken_at, count FROM citation_points WHERE cid = ? ORDER BY taken_at", (cid,)
+        ).fetchall()
+
+    def paper_growth(self, cid, start, end=None):
+        """
+        Citations gained in (start, end]: the count at end minus the count at
+        start, or minus the first count in the window if the publication was
+        first seen after start
+        """
+        start, end = to_timestamp(start), to_timestamp(end or datetime.now())
+        row = self.conn.execute(f"SELECT {GAINED_SQL}", {"cid": cid, "start": start, "end": end}).fetchone()
+        return row[0] or 0
+
+    def author_growth(self, author_id, start, end=None, top=10):
+        """
+        Citations an author's publications gained in (start, end], plus the top
+        gainers. Each publication is measured as in paper_growth, so one first
+        seen inside the window (including in the author's first snapshot)
+        counts only what it gained after that.
+        """
+        window = {"author_id": author_id, "start": to_timestamp(start), "end": to_timestamp(end or datetime.now())}
+        gains = self.conn.execute(
+            f"SELECT w.cid, pub.title, {GAINED_SQL.replace(':cid', 'w.cid')} AS gained "
+            "FROM (SELECT DISTINCT cid FROM citation_points "
+            "      WHERE author_id = :author_id AND taken_at > :start AND taken_at <= :end) w "
+            "JOIN publications pub ON pub.cid = w.cid",
+            window,
+        ).fetchall()
+        gainers = sorted(gains, key=lambda g: g[2], reverse=True)[:top]
+        return {
+            "total": sum(gained for _, _, gained in gains),
+            "top": [{"cid": cid, "title": title, "gained": gained} for cid, title, gained in gainers],
+        }
+
+
+def record_rows(author_id, rows, path=CITATION_HISTORY_DB):
+    """Record a snapshot if history is enabled (CITATION_HISTORY_DB not empty)"""
+    if not path:
+        return None
+    try:
+        history = CitationHistory(path)
+        try:
+            changed = history.record_snapshot(author_id, rows)
+        finally:
+            history.close()
+        print(f"Citation history: {changed} publications changed since the last snapshot")
+        return changed
+    except Exception as err:
+        print(f"Could not record citation history: {err}")
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("author_id")
+    parser.add_argument("--days", type=int, default=30, help="Window size, ending now")
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--db", default=CITATION_HISTORY_DB)
+    args = parser.parse_args()
+
+    history = CitationHistory(args.db)
+    start = datetime.now() - timedelta(days=args.days)
+    growth = history.author_growth(args.author_id, start, top=args.top)
+    history.close()
+
+    print(f"Citations gained in the last {args.days} days: {growth['total']}")
+    for idx, paper in enumerate(growth["top"], start=1):
+        print(f"{idx}. +{paper['gained']}  {paper['title']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,14 +1,29 @@
+import base64
+import codecs
+import heapq
+import json
 import os
 import random
+import re
 import time
+import zlib
+from html.parser import HTMLParser
 from urllib.parse import urljoin
 
 import pandas as pd
 import requests
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 from dotenv import load_dotenv
 from tqdm import tqdm
 
+from citation_history import record_rows
+from near_duplicates import merge_near_duplicates
+from search_index import SEARCH_INDEX_DB, index_rows
+from proxy_fleet import get_proxy_fleet
+from publication_keys import citation_id, normalize_title, owned_by, row_key
+from proxy_accounting import BudgetExceeded, format_estimate, format_option, get_accountant, page_kind, response_bytes, usage_run
+from stage_timing import span, timed, timed_run
+
 load_dotenv()
 
 AUTHOR_ID = os.getenv("AUTHOR_ID", "Q5qzD7EAAAAJ")
@@ -19,6 +34,9 @@ DECODO_USERNAME = os.getenv("DECODO_USERNAME", "")
 DECODO_PASSWORD = os.getenv("DECODO_PASSWORD", "")
 
 OUTPUT_CSV = os.getenv("OUTPUT_CSV", "scholar_results.csv")
+# Also write each save into the search index at SEARCH_INDEX_DB. Off by default: the app
+# indexes the CSV itself when its search box is used.
+SEARCH_INDEX_ON_SAVE = os.getenv("SEARCH_INDEX_ON_SAVE", "false").lower() == "true"
 
 FETCH_ABSTRACTS = os.getenv("FETCH_ABSTRACTS", "true").lower() == "true"
 SAVE_EVERY_N = int(os.getenv("SAVE_EVERY_N", "10"))
@@ -28,7 +46,42 @@ DETAIL_DELAY_MIN = float(os.getenv("DETAIL_DELAY_MIN", "2.2"))
 DETAIL_DELAY_MAX = float(os.getenv("DETAIL_DELAY_MAX", "4.0"))
 MAX_RETRIES = int(os.getenv("MAX_RETRIES", "3"))
 
-BASE_URL = "https://scholar.google.com"
+# Optional self-hosted proxy service nodes (simple_proxy_server.py, comma-separated);
+# with USE_PROXY_BATCH the detail pages are split across the nodes' /batch endpoints
+LOCAL_PROXY_URL = os.getenv("LOCAL_PROXY_URL", "").strip()
+USE_PROXY_BATCH = os.getenv("USE_PROXY_BATCH", "false").lower() == "true"
+PROXY_BATCH_TIMEOUT = int(os.getenv("PROXY_BATCH_TIMEOUT", "600"))
+# URLs per /batch request; budgets are checked between requests
+PROXY_BATCH_CHUNK = int(os.getenv("PROXY_BATCH_CHUNK", "25"))
+
+# "delta" re-reads only the listing pages and fetches detail pages for new
+# publications; "full" refetches every abstract in range
+SYNC_MODE = os.getenv("SYNC_MODE", "full").lower()
+
+# Point at mock_scholar_server.py (e.g. http://127.0.0.1:9100) to test offline
+BASE_URL = os.getenv("SCHOLAR_BASE_URL", "https://scholar.google.com").rstrip("/")
+
+# Order of abstract fetches: comma-separated keys from citations (most cited first),
+# recent (newest first) and profile (profile order), e.g. "citations,recent"
+ABSTRACT_PRIORITY = os.getenv("ABSTRACT_PRIORITY", "profile")
+# Stop fetching abstracts after this many seconds / detail pages (0 = no limit); the rest
+# are stored without abstracts and a continuation token finishes them later
+ABSTRACT_TIME_BUDGET = float(os.getenv("ABSTRACT_TIME_BUDGET", "0"))
+ABSTRACT_REQUEST_BUDGET = int(os.getenv("ABSTRACT_REQUEST_BUDGET", "0"))
+CONTINUATION_TOKEN = os.getenv("CONTINUATION_TOKEN", "").strip()
+
+# "ajax" loads listing pages after the first like the profile's "Show more" button:
+# just the publication rows, without the header, sidebar and charts. "full" GETs whole pages.
+LISTING_FETCH_MODE = os.getenv("LISTING_FETCH_MODE", "full").lower()
+
+# Download detail pages only as far as the description and close the connection
+# (falls back to reading the whole page when the citation table is not found)
+STREAM_DETAIL_PAGES = os.getenv("STREAM_DETAIL_PAGES", "false").lower() == "true"
+
+# Read the listing pages, print the proxy cost estimate with and without abstracts, and stop
+ESTIMATE_ONLY = os.getenv("ESTIMATE_ONLY", "false").lower() == "true"
+
+SKIPPED_ABSTRACT = "Skipped to save proxy usage."
 
 
 def build_proxy_url(username, password):
@@ -37,12 +90,15 @@ def build_proxy_url(username, password):
 
 def make_session(username, password):
     session = requests.Session()
+    # Provider that get_with_retry bills this session's requests to
+    session.proxy_provider = "direct"
     if username and password:
         proxy_url = build_proxy_url(username, password)
         session.proxies = {
             "http": proxy_url,
             "https": proxy_url,
         }
+        session.proxy_provider = "decodo"
 
     session.headers.update({
         "User-Agent": (
@@ -56,19 +112,24 @@ def make_session(username, password):
 
 
 def ghum(min_s, max_s):
-    time.sleep(random.uniform(min_s, max_s))
+    with span("sleep"):
+        time.sleep(random.uniform(min_s, max_s))
 
 
-def normalize_title(txt):
-    if not isinstance(txt, str):
-        return ""
-    return " ".join(txt.strip().lower().split())
+TEXT_COLUMNS = ("Title", "Authors", "Venue", "Scholar URL", "Abstract")
 
 
+@timed("load_csv")
 def load_existing(csv_path):
     if os.path.exists(csv_path):
         try:
-            df = pd.read_csv(csv_path)
+            # Only the numeric columns may be blank-as-NaN; "N/A" and "" stay as the scraper wrote them
+            df = pd.read_csv(
+                csv_path,
+                keep_default_na=False,
+                na_values={"Year": [""], "Citation Count": [""]},
+                dtype={column: str for column in TEXT_COLUMNS},
+            )
             print(f"Loaded existing cache: {csv_path} ({len(df)} rows)")
             return df
         except Exception as err:
@@ -80,27 +141,75 @@ def load_existing(csv_path):
 
 
 def save_rows(rows, csv_path):
-    pd.DataFrame(rows).to_csv(csv_path, index=False)
+    with span("save_csv"):
+        pd.DataFrame(rows).to_csv(csv_path, index=False)
     print(f"Saved {len(rows)} rows to {csv_path}")
+    if SEARCH_INDEX_ON_SAVE:
+        # Only new or changed rows are written to the index
+        with span("search_index"):
+            index_rows(rows, SEARCH_INDEX_DB)
+
+
+def session_provider(session):
+    return getattr(session, "proxy_provider", "direct")
 
 
-def get_with_retry(session, url, params=None, timeout=40, label="request"):
+def wire_body_bytes(res, default=0):
+    """Body bytes read off the wire so far (compressed, as urllib3 counts them), or default"""
+    raw_read = getattr(res.raw, "tell", None)
+    return raw_read() if raw_read else default
+
+
+def get_with_retry(session, url, params=None, timeout=40, label="request", data=None, read=None):
+    """
+    GET (or POST `data`) with retries; every attempt is accounted, and
+    BudgetExceeded is raised once a budget is spent. With read, the response is
+    streamed and read(res) -> (value, body bytes, saved bytes) consumes the body
+    inside the retry loop, so a connection dropped mid-body is retried and its
+    bytes still count; value is returned instead of the response.
+    """
+    accountant = get_accountant()
+    provider = session_provider(session)
+    kind = page_kind(url)
     last_err = None
     for attempt in range(1, MAX_RETRIES + 1):
+        accountant.check_budget(provider)
+        res = None
+        body_bytes, saved = None, 0
         try:
-            res = session.get(url, params=params, timeout=timeout)
+            with span("network"):
+                if data is None:
+                    res = session.get(url, params=params, timeout=timeout, stream=read is not None)
+                else:
+                    res = session.post(url, params=params, data=data, timeout=timeout)
             res.raise_for_status()
-            return res
+            if read is None:
+                return res
+            value, body_bytes, saved = read(res)
+            return value
         except Exception as err:
             last_err = err
             wait_time = 2.5 + random.uniform(1, 2.5) + (attempt - 1) * 2
             print(f"{label} failed ({attempt}/{MAX_RETRIES}): {err}")
             print(f"waiting {wait_time:.1f}s")
-            time.sleep(wait_time)
+            with span("retry_backoff"):
+                time.sleep(wait_time)
+        finally:
+            if res is None:
+                accountant.record(provider, kind, 0, retry=attempt > 1)
+            elif read is None:
+                accountant.record(provider, kind, response_bytes(res), retry=attempt > 1)
+            else:
+                res.close()
+                if body_bytes is None:
+                    body_bytes = wire_body_bytes(res)
+                accountant.record(provider, kind, response_bytes(res, body_bytes=body_bytes),
+                                  retry=attempt > 1, saved_bytes=saved)
 
     raise RuntimeError(f"{label} failed after {MAX_RETRIES} retries. Last error: {last_err}")
 
 
+@timed("parse_listing")
 def parse_author_page(html):
     soup = BeautifulSoup(html, "html.parser")
 
@@ -145,10 +254,117 @@ def parse_author_page(html):
     return author_name, rows
 
 
+@timed("parse_listing")
+def parse_author_page_legacy(html, start_year, end_year):
+    """
+    The app's original listing parser (scholarly-shaped dicts, year filter applied).
+    Returns (author_name, entries_on_page, publications, saw_older_than_range).
+    """
+    soup = BeautifulSoup(html, 'html.parser')
+
+    author_name = "Unknown Author"
+    name_elem = soup.find('div', {'id': 'gsc_prf_in'})
+    if name_elem:
+        author_name = name_elem.get_text(strip=True)
+
+    pub_rows = soup.find_all('tr', class_='gsc_a_tr')
+    if not pub_rows:
+        pub_rows = soup.find_all('div', class_='gsc_a_tr')
+
+    publications = []
+    found_older_than_range = False
+    for row in pub_rows:
+        try:
+            title_elem = row.find('a', class_='gsc_a_at')
+            if not title_elem:
+                title_elem = row.find('a')
+            if not title_elem:
+                continue
+
+            title = title_elem.get_text(strip=True)
+
+            year_elem = row.find('span', class_='gsc_a_y')
+            year = None
+            if year_elem:
+                year_match = re.search(r'\d{4}', year_elem.get_text(strip=True))
+                if year_match:
+                    year = int(year_match.group())
+
+            if year and year < start_year:
+                found_older_than_range = True
+            if year and (year < start_year or year > end_year):
+                continue
+
+            authors_elem = row.find('div', class_='gs_gray')
+            authors = authors_elem.get_text(strip=True) if authors_elem else "Unknown authors"
+
+            citations_elem = row.find('a', class_='gsc_a_c')
+            citations = 0
+            if citations_elem:
+                cite_digits = re.sub(r'[^\d]', '', citations_elem.get_text(strip=True))
+                citations = int(cite_digits) if cite_digits else 0
+
+            publications.append({
+                'bib': {
+                    'title': title,
+                    'pub_year': str(year) if year else 'Unknown',
+                    'author': authors,
+                    'citation_count': citations
+                },
+                'pub_url': title_elem.get('href', ''),
+                'num_citations': citations
+            })
+        except Exception:
+            continue
+
+    return author_name, len(pub_rows), publications, found_older_than_range
+
+
+def listing_fragment(text):
+    """
+    The rows HTML from a "Show more" (json=1) listing response, or None if the
+    response is not one. Scholar puts the rows under "B"; any other string
+    holding gsc_a_tr rows is accepted too, and an empty "B" means no more rows.
+    """
+    body = text.lstrip()
+    if body.startswith(")]}'"):
+        body = body[4:]
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    if not isinstance(data, dict):
+        return None
+    if isinstance(data.get("B"), str):
+        return data["B"]
+    for value in data.values():
+        if isinstance(value, str) and "gsc_a_tr" in value:
+            return value
+    return None
+
+
+def fetch_listing_fragment(session, author_id, start, pagesize=100):
+    """
+    Rows start..start+pagesize as the "Show more" button loads them.
+    Returns (rows HTML, or None if Scholar sent something else; response bytes).
+    """
+    res = get_with_retry(
+        session,
+        f"{BASE_URL}/citations",
+        params={"user": author_id, "hl": "en", "cstart": start, "pagesize": pagesize},
+        data={"json": "1"},
+        label=f"author rows start={start}",
+    )
+    return listing_fragment(res.text), len(res.content)
+
+
 def fetch_all_publications(session, author_id):
     all_rows = []
     start = 0
     author_name_final = None
+    full_page_bytes = 0
+    fragments, fragment_bytes = 0, 0
+    use_fragments = LISTING_FETCH_MODE == "ajax"
 
     while True:
         url = f"{BASE_URL}/citations"
@@ -159,8 +375,24 @@ def fetch_all_publications(session, author_id):
             "pagesize": 100,
         }
 
-        res = get_with_retry(session, url, params=params, label=f"author page start={start}")
-        author_name, page_rows = parse_author_page(res.text)
+        try:
+            html = None
+            if start and use_fragments:
+                html, size = fetch_listing_fragment(session, author_id, start)
+                if html is None:
+                    print(f"Rows at start={start} did not come back as a fragment; loading full pages")
+                    use_fragments = False
+                else:
+                    fragments += 1
+                    fragment_bytes += size
+            if html is None:
+                res = get_with_retry(session, url, params=params, label=f"author page start={start}")
+                html = res.text
+                full_page_bytes = full_page_bytes or len(res.content)
+        except BudgetExceeded as err:
+            print(f"Stopping at listing page start={start}: {err}")
+            break
+        author_name, page_rows = parse_author_page(html)
 
         if author_name_final is None:
             author_name_final = author_name
@@ -177,6 +409,9 @@ def fetch_all_publications(session, author_id):
         start += 100
         ghum(BASE_DELAY_MIN, BASE_DELAY_MAX)
 
+    if fragments:
+        print(f"Loaded {fragments} listing pages as row fragments: {fragment_bytes / 1024:.0f} KB "
+              f"instead of ~{fragments * full_page_bytes / 1024:.0f} KB as full pages")
     return author_name_final, all_rows
 
 
@@ -184,17 +419,144 @@ def fetch_abstract_from_detail(session, scholar_url):
     if not scholar_url or scholar_url == "N/A":
         return "No abstract available."
 
+    if STREAM_DETAIL_PAGES:
+        return parse_abstract_html(stream_detail_page(session, scholar_url))
     res = get_with_retry(session, scholar_url, label="detail page")
-    soup = BeautifulSoup(res.text, "html.parser")
+    return parse_abstract_html(res.text)
+
+
+class DetailTableWatcher(HTMLParser):
+    """
+    Fed a detail page from its citation table on, chunk by chunk; `done` once
+    the description row is complete (the next row starts) or the table closes
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=False)
+        self.depth = 0  # open divs from the table's own div down
+        self.in_field = False
+        self.seen_description = False
+        self.done = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag != "div" or self.done:
+            return
+        attrs = dict(attrs)
+        if not self.depth:
+            if attrs.get("id") == "gsc_oci_table":
+                self.depth = 1
+            return
+        self.depth += 1
+        classes = (attrs.get("class") or "").split()
+        if attrs.get("id") == "gsc_oci_descr":
+            self.seen_description = True
+        if self.depth == 2 and "gs_scl" in classes and self.seen_description:
+            self.done = True
+        self.in_field = "gsc_oci_field" in classes
+
+    def handle_endtag(self, tag):
+        if tag != "div" or not self.depth or self.done:
+            return
+        self.depth -= 1
+        self.in_field = False
+        if not self.depth:
+            self.done = True
+
+    def handle_data(self, data):
+        if self.in_field and data.strip().lower() == "description":
+            self.seen_description = True
+
+
+def stream_detail_page(session, scholar_url, chunk_size=2048):
+    """
+    Download a detail page only as far as its description row, then close the
+    connection. The body is read inside get_with_retry, so a connection reset
+    mid-page is retried; bytes read, and an estimate of those skipped, are
+    accounted there.
+    """
+    return get_with_retry(session, scholar_url, label="detail page",
+                          read=lambda res: read_detail_table(res, chunk_size))
+
+
+def read_detail_table(res, chunk_size=2048):
+    """
+    Read a streamed detail page up to its description row. Chunks are scanned
+    for the citation table's opening tag and fed to a DetailTableWatcher from
+    there; a page without the table is read to the end.
+    Returns (html, body bytes on the wire, estimated bytes skipped).
+    """
+    decoder = codecs.getincrementaldecoder(res.encoding or "utf-8")(errors="replace")
+    watcher = DetailTableWatcher()
+    html, table_at, body_bytes = "", None, 0
+    with span("network"):
+        for chunk in res.iter_content(chunk_size):
+            body_bytes += len(chunk)
+            scanned = len(html)
+            html += decoder.decode(chunk)
+            if table_at is None:
+                # Re-scan a little of the previous chunk in case the tag was split
+                table = DETAIL_TABLE_RE.search(html, max(0, scanned - 200))
+                if table is None:
+                    continue
+                table_at = scanned = table.start()
+            watcher.feed(html[scanned:])
+            if watcher.done:
+                break
+        html += decoder.decode(b"", final=True)
+
+    # On the wire the body may be compressed; urllib3 counts the raw bytes read
+    wire_bytes = wire_body_bytes(res, default=body_bytes)
+    saved = 0
+    if watcher.done:
+        length = res.headers.get("content-length")
+        full = int(length) if length and length.isdigit() else get_accountant().average_page_bytes("detail")
+        saved = max(0, int(full) - wire_bytes)
+    return html, wire_bytes, saved
+
+
+# The detail page's citation table; the description is one of its rows, and the
+# rows after it (citation graph, related articles) are never needed
+DETAIL_TABLE_RE = re.compile(r"""<div\b[^>]*\bid=["']?gsc_oci_table\b""")
+DESCRIPTION_RE = re.compile(r"""\bid=["']?gsc_oci_descr\b|>\s*Description\s*<""")
+TABLE_ROW_RE = re.compile(r"""<div\s+class=["']?gs_scl\b""")
+DETAIL_TABLE_STRAINER = SoupStrainer(id="gsc_oci_table")
+
+
+def detail_table_html(html):
+    """
+    The citation table of a detail page up to the end of its description row,
+    or None if the page has no citation table
+    """
+    table = DETAIL_TABLE_RE.search(html)
+    if not table:
+        return None
+    description = DESCRIPTION_RE.search(html, table.end())
+    next_row = TABLE_ROW_RE.search(html, description.end()) if description else None
+    return html[table.start():next_row.start() if next_row else len(html)]
+
+
+@timed("parse_detail")
+def parse_abstract_html(html):
+    """
+    The description from a detail page. Only the citation table is built, up
+    to its description row (see detail_table_html); pages without the table are
+    parsed whole.
+    """
+    table = detail_table_html(html)
+    if table is not None:
+        soup = BeautifulSoup(table, "html.parser", parse_only=DETAIL_TABLE_STRAINER)
+    else:
+        soup = BeautifulSoup(html, "html.parser")
 
-    abs_box = soup.select_one("#gsc_oci_descr")
+    # find() rather than CSS selectors: on a tree this small the selector engine's overhead dominates
+    abs_box = soup.find(id="gsc_oci_descr")
     if abs_box:
         txt = abs_box.get_text(" ", strip=True)
         return txt if txt else "No abstract available."
 
-    for row in soup.select(".gs_scl"):
-        field = row.select_one(".gsc_oci_field")
-        value = row.select_one(".gsc_oci_value")
+    for row in soup.find_all(class_="gs_scl"):
+        field = row.find(class_="gsc_oci_field")
+        value = row.find(class_="gsc_oci_value")
         if field and value and "description" in field.get_text(" ", strip=True).lower():
             txt = value.get_text(" ", strip=True)
             return txt if txt else "No abstract available."
@@ -202,6 +564,22 @@ def fetch_abstract_from_detail(session, scholar_url):
     return "No abstract available."
 
 
+def iter_proxy_batch(proxy_base, urls, timeout=PROXY_BATCH_TIMEOUT):
+    """Yield records from the proxy service's /batch endpoint as each page completes"""
+    res = requests.post(
+        f"{proxy_base.rstrip('/')}/batch",
+        json={"urls": urls},
+        stream=True,
+        timeout=(10, timeout),
+    )
+    with res:
+        # Inside the with, so an error response still releases its streamed connection
+        res.raise_for_status()
+        for line in res.iter_lines():
+            if line:
+                yield json.loads(line)
+
+
 def scrape_author_cost_optimized(session, author_id, start_year, end_year, fetch_abstracts, output_csv, use_cache=True):
     if use_cache:
         cache_df = load_existing(output_csv)
@@ -230,49 +608,368 @@ def scrape_author_cost_optimized(session, author_id, start_year, end_year, fetch
 
         filtered.append(row)
 
+    # Preprint/published copies and punctuation variants cost one detail fetch, not two
+    with span("near_duplicates"):
+        filtered, merged = merge_near_duplicates(filtered, existing=final_res)
+    if merged:
+        print(f"Merged {merged} near-duplicate publications")
+
     print(f"Publications selected in {start_year}-{end_year}: {len(filtered)}")
     if not filtered:
         print("Nothing to scrape for the requested range.")
-        return final_res
+        if merged and output_csv:
+            # Stored rows may have picked up aliases
+            save_rows(final_res, output_csv)
+        return final_res, []
 
     unsaved = 0
-    for pub in tqdm(filtered):
+
+    def store(pub):
+        nonlocal unsaved
+        final_res.append(pub)
+        existing_titles.add(normalize_title(pub["Title"]))
+        unsaved += 1
+
+        if output_csv and unsaved >= SAVE_EVERY_N:
+            save_rows(final_res, output_csv)
+            unsaved = 0
+
+    pending = fetch_details(session, filtered, fetch_abstracts, store)
+
+    if output_csv:
+        save_rows(final_res, output_csv)
+    return final_res, pending
+
+
+def as_number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 0
+
+
+# Sort keys for ABSTRACT_PRIORITY; ties keep profile order
+PRIORITY_KEYS = {
+    "citations": lambda pub: -as_number(pub.get("Citation Count")),
+    "recent": lambda pub: -as_number(pub.get("Year")),
+    "profile": lambda pub: 0,
+}
+
+
+def priority_queue(pubs, keys=None):
+    """Heap of (priority, profile position, pub) ordered by comma-separated PRIORITY_KEYS names"""
+    names = [name.strip() for name in (keys or ABSTRACT_PRIORITY).split(",") if name.strip()]
+    unknown = set(names) - set(PRIORITY_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown ABSTRACT_PRIORITY keys: {', '.join(sorted(unknown))}")
+    heap = [(tuple(PRIORITY_KEYS[name](pub) for name in names), i, pub) for i, pub in enumerate(pubs)]
+    heapq.heapify(heap)
+    return heap
+
+
+def encode_continuation(pubs):
+    """Token naming the detail pages still to fetch (their citation IDs)"""
+    cids = [cid for cid in map(citation_id, (pub.get("Scholar URL") for pub in pubs)) if cid]
+    if not cids:
+        return None
+    return base64.urlsafe_b64encode(zlib.compress(json.dumps(cids).encode("utf-8"))).decode("ascii")
+
+
+def decode_continuation(token):
+    try:
+        return set(json.loads(zlib.decompress(base64.urlsafe_b64decode(token.encode("ascii")))))
+    except (ValueError, zlib.error) as err:
+        raise ValueError(f"Invalid continuation token: {err}") from None
+
+
+def budget_stop_reason(deadline, requests_made):
+    """Why abstract fetches must stop now (time or request budget), or None"""
+    if deadline is not None and time.monotonic() >= deadline:
+        return f"time budget of {ABSTRACT_TIME_BUDGET:g}s used up"
+    if ABSTRACT_REQUEST_BUDGET and requests_made >= ABSTRACT_REQUEST_BUDGET:
+        return f"request budget of {ABSTRACT_REQUEST_BUDGET} detail pages used up"
+    return None
+
+
+def fetch_details(session, filtered, fetch_abstracts, store):
+    """
+    Fill in each publication's abstract (or skip it) and hand it to store(),
+    most important first by ABSTRACT_PRIORITY. Once the ABSTRACT_TIME_BUDGET or
+    ABSTRACT_REQUEST_BUDGET (or a proxy budget) is spent, the rest are stored
+    without abstracts. Returns the publications left pending, for a continuation token.
+    """
+    if fetch_abstracts and filtered:
+        estimate = get_accountant().estimate(session_provider(session), 0, len(filtered))
+        print(f"Estimated cost of {len(filtered)} detail pages: {format_option(estimate['with_abstracts'])}")
+    queue = priority_queue(filtered)
+    deadline = time.monotonic() + ABSTRACT_TIME_BUDGET if ABSTRACT_TIME_BUDGET else None
+    stop_reason = None
+    requests_made = 0
+
+    if fetch_abstracts and USE_PROXY_BATCH and LOCAL_PROXY_URL:
+        # The proxy service paces these server-side; results arrive as they complete.
+        # URLs go out in priority order, PROXY_BATCH_CHUNK per request, with the budgets checked in between
+        by_url = {entry[-1]["Scholar URL"]: entry[-1] for entry in sorted(queue) if entry[-1]["Scholar URL"] != "N/A"}
+        urls = list(by_url)
+        done = set()
         try:
-            if fetch_abstracts:
+            # Self time of "proxy_batch" is waiting on the proxy service; parsing and saving are their own stages
+            with span("proxy_batch"), tqdm(total=len(urls)) as progress:
+                for start in range(0, len(urls), PROXY_BATCH_CHUNK):
+                    stop_reason = budget_stop_reason(deadline, requests_made)
+                    if stop_reason:
+                        break
+                    get_accountant().check_budget("local_proxy")
+                    chunk = urls[start:start + PROXY_BATCH_CHUNK]
+                    if ABSTRACT_REQUEST_BUDGET:
+                        chunk = chunk[:ABSTRACT_REQUEST_BUDGET - requests_made]
+                    for _, record in get_proxy_fleet().iter_batch(chunk, iter_proxy_batch):
+                        requests_made += 1
+                        progress.update()
+                        # Nodes report the page's raw (encoded) size; older ones only send the decoded body
+                        body_bytes = record.get("bytes", len((record.get("body") or "").encode("utf-8")))
+                        get_accountant().record("local_proxy", "detail", body_bytes)
+                        pub = by_url.get(record.get("url"))
+                        if pub is None or record.get("status") != 200 or record.get("blocked"):
+                            continue
+                        pub["Abstract"] = parse_abstract_html(record.get("body", ""))
+                        store(pub)
+                        done.add(record["url"])
+        except BudgetExceeded as err:
+            stop_reason = str(err)
+        except Exception as err:
+            print(f"Proxy batch failed: {err}")
+
+        queue = [entry for entry in queue if entry[-1]["Scholar URL"] not in done]
+        heapq.heapify(queue)
+        if queue and stop_reason:
+            print(f"Stopping abstract fetches: {stop_reason}; {len(queue)} left for a later run")
+        elif queue:
+            print(f"Fetching {len(queue)} remaining detail pages one by one")
+
+    pending = []
+    for _ in tqdm(range(len(queue))):
+        *_, pub = heapq.heappop(queue)
+        if fetch_abstracts and stop_reason is None:
+            stop_reason = budget_stop_reason(deadline, requests_made)
+            if stop_reason:
+                print(f"Stopping abstract fetches: {stop_reason}; {len(queue) + 1} left for a later run")
+        try:
+            if fetch_abstracts and stop_reason is None:
                 ghum(DETAIL_DELAY_MIN, DETAIL_DELAY_MAX)
+                requests_made += 1
                 pub["Abstract"] = fetch_abstract_from_detail(session, pub["Scholar URL"])
+                store(pub)
+                ghum(BASE_DELAY_MIN, BASE_DELAY_MAX)
             else:
-                pub["Abstract"] = "Skipped to save proxy usage."
+                if fetch_abstracts:
+                    pending.append(pub)
+                pub["Abstract"] = SKIPPED_ABSTRACT
+                store(pub)
+        except BudgetExceeded as err:
+            print(f"Stopping abstract fetches: {err}")
+            stop_reason = str(err)
+            pending.append(pub)
+            pub["Abstract"] = SKIPPED_ABSTRACT
+            store(pub)
+        except Exception as err:
+            print(f"Skipping '{pub.get('Title', 'N/A')}' due to error: {err}")
+            ghum(1.5, 2.5)
+
+    return pending
+
+
+def split_by_author(rows, author_id):
+    """(author_id's rows, everyone else's) from a CSV shared by several authors"""
+    mine, others = [], []
+    for row in rows:
+        (mine if owned_by(row, author_id) else others).append(row)
+    return mine, others
+
+
+def same_value(a, b):
+    # Values read back from the CSV come through pandas (NaN for blanks, floats for years)
+    if pd.isna(a) and pd.isna(b):
+        return True
+    return not pd.isna(a) and not pd.isna(b) and a == b
+
+
+def has_abstract(row):
+    abstract = row.get("Abstract")
+    return isinstance(abstract, str) and abstract.strip() not in ("", SKIPPED_ABSTRACT)
+
+
+def sync_author_delta(session, author_id, start_year, end_year, fetch_abstracts, output_csv):
+    """
+    Incremental refresh against the rows already in output_csv, matched by citation ID.
+    Only the listing pages are re-read: known rows get their citation count and
+    listing fields updated in place, and detail pages are fetched only for new
+    in-range publications (or known ones still missing an abstract).
+    Other authors' rows in output_csv are saved back untouched and not returned.
+    Returns (rows, {"added", "updated", "unchanged"}, publications left pending).
+    """
+    stored = load_existing(output_csv).to_dict(orient="records") if output_csv else []
+    final_res, others = split_by_author(stored, author_id)
+    by_key = {row_key(row): row for row in final_res}
 
+    author_name, all_rows = fetch_all_publications(session, author_id)
+    print(f"Author: {author_name}")
+    print(f"Total publications found on profile: {len(all_rows)}")
+
+    stats = {"added": 0, "updated": 0, "unchanged": 0}
+    listing_fields = ("Title", "Year", "Authors", "Venue", "Citation Count", "Scholar URL")
+    new_pubs, refill = [], []
+    for row in all_rows:
+        known = by_key.get(row_key(row))
+        if known is None:
+            year = row.get("Year")
+            if year is not None and start_year <= year <= end_year:
+                new_pubs.append(row)
+            continue
+
+        changed = [field for field in listing_fields if not same_value(known.get(field), row[field])]
+        for field in changed:
+            known[field] = row[field]
+        if fetch_abstracts and not has_abstract(known) and row.get("Year") is not None \
+                and start_year <= row["Year"] <= end_year:
+            refill.append(known)
+        elif changed:
+            stats["updated"] += 1
+        else:
+            stats["unchanged"] += 1
+
+    with span("near_duplicates"):
+        new_pubs, merged = merge_near_duplicates(new_pubs, existing=final_res)
+    if merged:
+        print(f"Merged {merged} near-duplicate publications")
+
+    print(f"Delta sync: {len(new_pubs)} new, {len(refill)} missing abstracts, "
+          f"{stats['updated']} updated from the listing")
+
+    unsaved = 0
+
+    def store(pub):
+        nonlocal unsaved
+        key = row_key(pub)
+        if key in by_key:
+            stats["updated"] += 1
+        else:
+            by_key[key] = pub
             final_res.append(pub)
-            existing_titles.add(normalize_title(pub["Title"]))
-            unsaved += 1
+            stats["added"] += 1
+        unsaved += 1
 
-            if output_csv and unsaved >= SAVE_EVERY_N:
-                save_rows(final_res, output_csv)
-                unsaved = 0
+        if output_csv and unsaved >= SAVE_EVERY_N:
+            save_rows(others + final_res, output_csv)
+            unsaved = 0
 
-            ghum(BASE_DELAY_MIN, BASE_DELAY_MAX)
-        except Exception as err:
-            print(f"Skipping '{pub.get('Title', 'N/A')}' due to error: {err}")
-            ghum(1.5, 2.5)
+    pending = fetch_details(session, new_pubs + refill, fetch_abstracts, store)
 
     if output_csv:
-        save_rows(final_res, output_csv)
-    return final_res
+        save_rows(others + final_res, output_csv)
+    print(f"Delta sync done: {stats['added']} added, {stats['updated']} updated, {stats['unchanged']} unchanged")
+    return final_res, stats, pending
+
+
+def resume_abstracts(session, author_id, token, output_csv):
+    """
+    Fetch the abstracts a budget-limited run left pending, named by its
+    continuation token, into author_id's rows of output_csv; no listing pages are read.
+    Returns (rows, {"added", "updated", "unchanged"}, publications still pending).
+    """
+    wanted_ids = decode_continuation(token)
+    final_res, others = split_by_author(load_existing(output_csv).to_dict(orient="records"), author_id)
+    wanted = [
+        row for row in final_res
+        if citation_id(row.get("Scholar URL")) in wanted_ids and not has_abstract(row)
+    ]
+    print(f"Resuming {len(wanted)} pending abstracts")
+
+    stats = {"added": 0, "updated": 0, "unchanged": len(final_res) - len(wanted)}
+    unsaved = 0
+
+    def store(pub):
+        nonlocal unsaved
+        if has_abstract(pub):
+            stats["updated"] += 1
+        unsaved += 1
+        if unsaved >= SAVE_EVERY_N:
+            save_rows(others + final_res, output_csv)
+            unsaved = 0
+
+    pending = fetch_details(session, wanted, True, store)
+    save_rows(others + final_res, output_csv)
+    return final_res, stats, pending
+
+
+def scrape_author(session, author_id, start_year, end_year, fetch_abstracts, output_csv, sync_mode=SYNC_MODE,
+                  continuation=None):
+    """
+    Refresh an author with SYNC_MODE and record a citation snapshot; returns
+    (rows, stats or None, continuation token or None). The token is set when a
+    budget stopped abstract fetches; passed back as continuation, only the
+    abstracts that run left pending are fetched.
+    The run's per-stage timing is logged to SCRAPE_TIMING_LOG and its proxy usage to PROXY_USAGE_DB.
+    """
+    with usage_run(author_id), timed_run("scrape_author", author_id=author_id, sync_mode=sync_mode):
+        if continuation and output_csv:
+            rows, stats, pending = resume_abstracts(session, author_id, continuation, output_csv)
+        elif sync_mode == "delta" and output_csv:
+            rows, stats, pending = sync_author_delta(
+                session, author_id, start_year, end_year, fetch_abstracts, output_csv
+            )
+        else:
+            rows, pending = scrape_author_cost_optimized(
+                session=session,
+                author_id=author_id,
+                start_year=start_year,
+                end_year=end_year,
+                fetch_abstracts=fetch_abstracts,
+                output_csv=output_csv,
+                use_cache=False,
+            )
+            stats = None
+        with span("citation_history"):
+            record_rows(author_id, rows)
+    return rows, stats, encode_continuation(pending)
+
+
+def estimate_scrape_cost(session, author_id, start_year, end_year, output_csv=None):
+    """
+    Read the author's listing pages and estimate the proxy cost of a run with
+    and without abstracts. Detail pages are counted for in-range publications
+    that output_csv has no abstract for yet.
+    """
+    known = {row_key(row): row for row in load_existing(output_csv).to_dict(orient="records")} if output_csv else {}
+    _, all_rows = fetch_all_publications(session, author_id)
+    listing_pages = len(all_rows) // 100 + 1
+    detail_pages = sum(
+        1 for row in all_rows
+        if row.get("Year") is not None and start_year <= row["Year"] <= end_year
+        and not has_abstract(known.get(row_key(row), {}))
+    )
+    return get_accountant().estimate(session_provider(session), listing_pages, detail_pages)
 
 
 def main():
     session = make_session(DECODO_USERNAME, DECODO_PASSWORD)
-    data = scrape_author_cost_optimized(
+    if ESTIMATE_ONLY:
+        with usage_run(AUTHOR_ID):
+            estimate = estimate_scrape_cost(session, AUTHOR_ID, START_YEAR, END_YEAR, OUTPUT_CSV)
+        print(format_estimate(estimate))
+        return
+
+    data, _, token = scrape_author(
         session=session,
         author_id=AUTHOR_ID,
         start_year=START_YEAR,
         end_year=END_YEAR,
         fetch_abstracts=FETCH_ABSTRACTS,
         output_csv=OUTPUT_CSV,
-        use_cache=False,
+        continuation=CONTINUATION_TOKEN or None,
     )
+    if token:
+        print(f"Some abstracts are still pending; finish them with CONTINUATION_TOKEN={token}")
 
     data_in_range = []
     for row in data:
@@ -1,13 +1,20 @@
 from scholarly import scholarly, ProxyGenerator
 import csv
+import json
 import time
 import random
 import os
 from dotenv import load_dotenv
+from scholarly_parallel import fill_concurrently, FILL_CONCURRENCY
 
 # Load environment variables from .env file
 load_dotenv()
 
+OUTPUT_CSV = 'scholar_papers_scholarly.csv'
+CSV_FIELDS = ['title', 'authors', 'publication', 'year', 'citations', 'abstract', 'url']
+# Filled publications are appended here as they finish, so an interrupted run resumes
+CHECKPOINT_FILE = os.getenv('SCHOLARLY_CHECKPOINT', 'scholar_papers_scholarly.checkpoint.jsonl')
+
 def setup_proxy():
     """
     Set up a proxy to avoid Google Scholar blocking.
@@ -140,9 +147,62 @@ def setup_proxy():
     print("Continuing without proxy (may get blocked by Google Scholar)")
     return False
 
-def scrape_with_scholarly(author_id, start_year=2023, end_year=2026, max_retries=3):
+def listing_year(pub):
+    """pub_year from the profile listing, or None if the listing has none"""
+    year = str(pub.get('bib', {}).get('pub_year', ''))
+    return int(year) if year.isdigit() else None
+
+
+def pub_key(pub):
+    return pub.get('author_pub_id') or pub.get('bib', {}).get('title', '')
+
+
+def load_checkpoint(path, author_id):
+    """{pub key: paper row or None} for publications this author already had filled"""
+    done = {}
+    if not path or not os.path.exists(path):
+        return done
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # partial last line from an interrupted write
+            if entry.get('author_id') == author_id:
+                done[entry['key']] = entry.get('row')
+    return done
+
+
+def clear_checkpoint(path, author_id):
+    """Drop this author's entries from the checkpoint; other authors' progress is kept"""
+    if not path or not os.path.exists(path):
+        return
+    kept = []
+    with open(path, encoding='utf-8') as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if entry.get('author_id') != author_id:
+                kept.append(line if line.endswith('\n') else line + '\n')
+    if not kept:
+        os.remove(path)
+        return
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        f.writelines(kept)
+    os.replace(tmp_path, path)
+
+
+def scrape_with_scholarly(author_id, start_year=2023, end_year=2026, max_retries=3,
+                          output_csv=OUTPUT_CSV, checkpoint_path=CHECKPOINT_FILE,
+                          concurrency=FILL_CONCURRENCY):
     """
     Use the scholarly library to scrape Google Scholar data.
+    Publications are filtered on their listing year before any detail fetch,
+    in-range ones are filled in parallel, and each row is written to the CSV
+    (and the checkpoint) as soon as it is filled.
     """
     papers = []
     
@@ -166,32 +226,71 @@ def scrape_with_scholarly(author_id, start_year=2023, end_year=2026, max_retries
     print(f"Author: {author['name']}")
     print(f"Total publications: {len(author['publications'])}\n")
     
-    for pub in author['publications']:
-        try:
-            # Fill publication details including abstract
-            pub_filled = scholarly.fill(pub)
-            
-            year = pub_filled['bib'].get('pub_year')
-            if year and year.isdigit():
-                year = int(year)
-                
-                if start_year <= year <= end_year:
-                    paper_data = {
-                        'title': pub_filled['bib'].get('title', ''),
-                        'authors': ', '.join(pub_filled['bib'].get('author', [])),
-                        'publication': pub_filled['bib'].get('venue', ''),
-                        'year': year,
-                        'citations': pub_filled.get('num_citations', 0),
-                        'abstract': pub_filled['bib'].get('abstract', ''),
-                        'url': pub_filled.get('pub_url', '')
-                    }
-                    
-                    papers.append(paper_data)
-                    print(f"Found: {paper_data['title']} ({year})")
+    # Only in-range publications are filled; ones without a listing year are
+    # filled too and checked against the year on their detail page
+    candidates = [
+        pub for pub in author['publications']
+        if listing_year(pub) is None or start_year <= listing_year(pub) <= end_year
+    ]
+    done = load_checkpoint(checkpoint_path, author_id)
+    todo = [pub for pub in candidates if pub_key(pub) not in done]
+    print(f"{len(candidates)} publications in range, {len(candidates) - len(todo)} already in checkpoint\n")
+    
+    csv_file = open(output_csv, 'w', newline='', encoding='utf-8') if output_csv else None
+    checkpoint = open(checkpoint_path, 'a', encoding='utf-8') if checkpoint_path else None
+    writer = None
+    if csv_file:
+        writer = csv.DictWriter(csv_file, fieldnames=CSV_FIELDS)
+        writer.writeheader()
+    
+    def keep(paper_data):
+        papers.append(paper_data)
+        if writer:
+            writer.writerow(paper_data)
+            csv_file.flush()
+    
+    failed = 0
+    try:
+        # Rows recovered from an interrupted run go out first
+        for pub in candidates:
+            row = done.get(pub_key(pub))
+            if row:
+                keep(row)
         
-        except Exception as e:
-            print(f"Error processing publication: {e}")
-            continue
+        for index, pub_filled, error in fill_concurrently(todo, concurrency):
+            if error:
+                print(f"Error processing publication: {error}")
+                failed += 1
+                continue
+            
+            paper_data = None
+            year = listing_year(pub_filled)
+            if year is not None and start_year <= year <= end_year:
+                paper_data = {
+                    'title': pub_filled['bib'].get('title', ''),
+                    'authors': ', '.join(pub_filled['bib'].get('author', [])),
+                    'publication': pub_filled['bib'].get('venue', ''),
+                    'year': year,
+                    'citations': pub_filled.get('num_citations', 0),
+                    'abstract': pub_filled['bib'].get('abstract', ''),
+                    'url': pub_filled.get('pub_url', '')
+                }
+                keep(paper_data)
+                print(f"Found: {paper_data['title']} ({year})")
+            
+            if checkpoint:
+                # Out-of-range results are recorded too, so they are not filled again
+                checkpoint.write(json.dumps({'author_id': author_id, 'key': pub_key(todo[index]), 'row': paper_data}) + '\n')
+                checkpoint.flush()
+    finally:
+        if csv_file:
+            csv_file.close()
+        if checkpoint:
+            checkpoint.close()
+    
+    if checkpoint_path and not failed:
+        # Finished cleanly: the next run for this author should fetch fresh data
+        clear_checkpoint(checkpoint_path, author_id)
     
     return papers
 
@@ -200,16 +299,11 @@ def main():
     setup_proxy()
     
     user_id = "a6MYnuUAAAAJ"
+    # Rows are streamed into the CSV as each publication is filled
     papers = scrape_with_scholarly(user_id, 2023, 2026)
     
-    # Save to CSV
     if papers:
-        with open('scholar_papers_scholarly.csv', 'w', newline='', encoding='utf-8') as f:
-            writer = csv.DictWriter(f, fieldnames=['title', 'authors', 'publication', 'year', 'citations', 'abstract', 'url'])
-            writer.writeheader()
-            writer.writerows(papers)
-        
-        print(f"\nSaved {len(papers)} papers to scholar_papers_scholarly.csv")
+        print(f"\nSaved {len(papers)} papers to {OUTPUT_CSV}")
 
 if __name__ == "__main__":
     main()
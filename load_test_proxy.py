@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+"""
+Load test for simple_proxy_server.py
+Fires concurrent /proxy requests and reports how many a single worker
+completes, at what latency.
+
+Example (one worker, local upstream so Google is never hit):
+    python -m http.server 9000 &
+    PROXY_MAX_REQUESTS_PER_MINUTE=100000 \
+        uvicorn simple_proxy_server:app --port 8000 --workers 1 &
+    python load_test_proxy.py --proxy http://127.0.0.1:8000 \
+        --target http://127.0.0.1:9000/ --concurrency 50 --requests 200
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def run_load_test(proxy_url, target_url, total_requests, concurrency, timeout):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    statuses = {}
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+
+        async def one_request():
+            async with semaphore:
+                started = time.perf_counter()
+                try:
+                    res = await client.get(f"{proxy_url.rstrip('/')}/proxy", params={'url': target_url})
+                    status = res.status_code
+                except httpx.HTTPError as e:
+                    status = type(e).__name__
+                latencies.append(time.perf_counter() - started)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one_request() for _ in range(total_requests)))
+        elapsed = time.perf_counter() - started
+
+    return {
+        'requests': total_requests,
+        'concurrency': concurrency,
+        'elapsed_s': elapsed,
+        'throughput_rps': total_requests / elapsed if elapsed else 0.0,
+        'p50_s': statistics.median(latencies),
+        'p95_s': statistics.quantiles(latencies, n=20)[-1] if len(latencies) >= 2 else latencies[0],
+        'statuses': statuses,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--proxy', default='http://127.0.0.1:8000', help='Base URL of the proxy service')
+    parser.add_argument('--target', default='http://127.0.0.1:9000/', help='URL the proxy should fetch')
+    parser.add_argument('--requests', type=int, default=100)
+    parser.add_argument('--concurrency', type=int, default=20)
+    parser.add_argument('--timeout', type=float, default=120.0)
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load_test(args.proxy, args.target, args.requests, args.concurrency, args.timeout))
+
+    print("=" * 60)
+    print(f"Proxy:        {args.proxy}")
+    print(f"Target:       {args.target}")
+    print(f"Requests:     {result['requests']} (concurrency {result['concurrency']})")
+    print(f"Elapsed:      {result['elapsed_s']:.1f}s")
+    print(f"Throughput:   {result['throughput_rps']:.2f} req/s")
+    print(f"Latency p50:  {result['p50_s']:.2f}s   p95: {result['p95_s']:.2f}s")
+    print(f"Statuses:     {result['statuses']}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,284 @@
+"""
+Local stand-in for Google Scholar with fault injection
+Serves /citations listing and detail pages built from the recorded fixtures in
+benchmarks/fixtures (every author ID is a synthetic profile), plus the "Show
+more" POST (json=1) that returns only the listing rows, with configurable
+latency, injected 429/503s, CAPTCHA pages, truncated bodies and rate-based
+blocking, so retry, block detection and circuit breakers can be exercised and
+load-tested offline.
+
+    uvicorn mock_scholar_server:app --port 9100
+    SCHOLAR_BASE_URL=http://127.0.0.1:9100 python google_scholar_scraper.py
+
+Fault settings come from the environment and can be changed while running:
+    curl -X POST localhost:9100/_mock/config -d '{"error_rate_429": 0.2}'
+    curl localhost:9100/_mock/stats
+"""
+
+import asyncio
+import json
+import math
+import os
+import random
+import threading
+import time
+import zlib
+from collections import OrderedDict, defaultdict, deque
+from urllib.parse import parse_qs, quote
+
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import HTMLResponse, JSONResponse, RedirectResponse, Response
+from starlette.routing import Route
+
+from benchmarks.synthetic import SyntheticProfile, load_fixture
+
+# Publications per synthetic profile, and how many profiles are kept built
+MOCK_PUBLICATIONS = int(os.getenv('MOCK_PUBLICATIONS', '300'))
+MOCK_PROFILE_CACHE = int(os.getenv('MOCK_PROFILE_CACHE', '8'))
+
+# Response delay: 'none', 'fixed:S', 'uniform:MIN:MAX' or 'lognormal:MEDIAN:SIGMA' (seconds)
+MOCK_LATENCY = os.getenv('MOCK_LATENCY', 'none')
+
+# Fraction of page requests answered with each fault
+MOCK_ERROR_RATE_429 = float(os.getenv('MOCK_ERROR_RATE_429', '0'))
+MOCK_ERROR_RATE_503 = float(os.getenv('MOCK_ERROR_RATE_503', '0'))
+MOCK_CAPTCHA_RATE = float(os.getenv('MOCK_CAPTCHA_RATE', '0'))
+MOCK_TRUNCATE_RATE = float(os.getenv('MOCK_TRUNCATE_RATE', '0'))
+
+# Rate-based blocking: a client sending more than this many requests per minute
+# is redirected to /sorry/ for MOCK_BLOCK_SECONDS. 0 disables it.
+MOCK_BLOCK_RATE = int(os.getenv('MOCK_BLOCK_RATE', '0'))
+MOCK_BLOCK_SECONDS = float(os.getenv('MOCK_BLOCK_SECONDS', '60'))
+
+MOCK_SEED = os.getenv('MOCK_SEED')
+
+CONFIG_KEYS = {
+    'latency': str,
+    'error_rate_429': float,
+    'error_rate_503': float,
+    'captcha_rate': float,
+    'truncate_rate': float,
+    'block_rate': int,
+    'block_seconds': float,
+    'publications': int,
+}
+
+
+def parse_latency(spec):
+    """Sampler for a MOCK_LATENCY spec; returns a function giving seconds to wait"""
+    kind, _, args = (spec or 'none').strip().lower().partition(':')
+    values = [float(v) for v in args.split(':') if v]
+    if kind in ('', 'none', '0'):
+        return lambda: 0.0
+    if kind == 'fixed':
+        return lambda: values[0]
+    if kind == 'uniform':
+        return lambda: random.uniform(values[0], values[1])
+    if kind == 'lognormal':
+        return lambda: random.lognormvariate(math.log(values[0]), values[1])
+    raise ValueError(f"Unknown latency spec: {spec}")
+
+
+class MockState:
+    """Fault settings, per-client request windows and counters"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.config = {
+            'latency': MOCK_LATENCY,
+            'error_rate_429': MOCK_ERROR_RATE_429,
+            'error_rate_503': MOCK_ERROR_RATE_503,
+            'captcha_rate': MOCK_CAPTCHA_RATE,
+            'truncate_rate': MOCK_TRUNCATE_RATE,
+            'block_rate': MOCK_BLOCK_RATE,
+            'block_seconds': MOCK_BLOCK_SECONDS,
+            'publications': MOCK_PUBLICATIONS,
+        }
+        self.latency = parse_latency(MOCK_LATENCY)
+        self.profiles = OrderedDict()
+        self.windows = defaultdict(deque)
+        self.blocked_until = {}
+        self.stats = defaultdict(int)
+
+    def update(self, changes):
+        unknown = set(changes) - set(CONFIG_KEYS)
+        if unknown:
+            raise ValueError(f"Unknown settings: {', '.join(sorted(unknown))}")
+        values = {key: CONFIG_KEYS[key](value) for key, value in changes.items()}
+        latency = parse_latency(values['latency']) if 'latency' in values else None
+        with self.lock:
+            self.config.update(values)
+            if latency is not None:
+                self.latency = latency
+            if 'publications' in values:
+                self.profiles.clear()
+            if 'block_rate' in values or 'block_seconds' in values:
+                self.blocked_until.clear()
+
+    def profile(self, user):
+        with self.lock:
+            profile = self.profiles.get(user)
+            if profile is not None:
+                self.profiles.move_to_end(user)
+                return profile
+        profile = SyntheticProfile(self.config['publications'], seed=zlib.crc32(user.encode()), user=user)
+        with self.lock:
+            self.profiles[user] = profile
+            while len(self.profiles) > MOCK_PROFILE_CACHE:
+                self.profiles.popitem(last=False)
+        return profile
+
+    def is_blocked(self, client):
+        """Record a request from client; True while it is blocked for going over the rate"""
+        now = time.monotonic()
+        with self.lock:
+            if self.blocked_until.get(client, 0) > now:
+                return True
+            rate = self.config['block_rate']
+            if not rate:
+                return False
+            window = self.windows[client]
+            window.append(now)
+            while window and window[0] <= now - 60:
+                window.popleft()
+            if len(window) > rate:
+                self.blocked_until[client] = now + self.config['block_seconds']
+                window.clear()
+                self.stats['clients_blocked'] += 1
+                return True
+            return False
+
+    def roll(self):
+        """Pick an injected fault for this request, or None"""
+        r = random.random()
+        for fault in ('error_rate_429', 'error_rate_503', 'captcha_rate', 'truncate_rate'):
+            r -= self.config[fault]
+            if r < 0:
+                return fault
+        return None
+
+
+state = MockState()
+if MOCK_SEED is not None:
+    random.seed(MOCK_SEED)
+SORRY_PAGE = load_fixture('sorry_page.html')
+
+
+class TruncatedResponse(HTMLResponse):
+    """Declares the full Content-Length but sends only part of the body, then ends"""
+
+    async def __call__(self, scope, receive, send):
+        await send({'type': 'http.response.start', 'status': self.status_code, 'headers': self.raw_headers})
+        await send({'type': 'http.response.body', 'body': self.body[:len(self.body) // 2], 'more_body': False})
+
+
+def client_key(request):
+    forwarded = request.headers.get('x-forwarded-for', '')
+    if forwarded:
+        return forwarded.split(',')[0].strip()
+    return request.client.host if request.client else 'unknown'
+
+
+async def serve_page(request, render, media_type='text/html'):
+    """Apply latency and faults, then answer with render() (the body, or None for 404)"""
+    await asyncio.sleep(state.latency())
+    state.stats['requests'] += 1
+
+    if state.is_blocked(client_key(request)):
+        state.stats['sorry_redirects'] += 1
+        return RedirectResponse(f"/sorry/index?continue={quote(str(request.url), safe='')}", status_code=302)
+
+    fault = state.roll()
+    if fault == 'error_rate_429':
+        state.stats['injected_429'] += 1
+        return Response('Too Many Requests', status_code=429, headers={'Retry-After': '30'})
+    if fault == 'error_rate_503':
+        state.stats['injected_503'] += 1
+        return Response('Service Unavailable', status_code=503)
+    if fault == 'captcha_rate':
+        # Served as a 200, like the challenge pages that only content checks catch
+        state.stats['captcha_pages'] += 1
+        return HTMLResponse(SORRY_PAGE)
+
+    body = render()
+    if body is None:
+        state.stats['not_found'] += 1
+        return HTMLResponse('<html><body>Not found</body></html>', status_code=404)
+    if fault == 'truncate_rate':
+        state.stats['truncated'] += 1
+        return TruncatedResponse(body, media_type=media_type)
+    state.stats['pages'] += 1
+    return Response(body, media_type=media_type)
+
+
+async def citations(request: Request):
+    params = request.query_params
+    if params.get('view_op') == 'view_citation':
+        user, _, cid = params.get('citation_for_view', '').partition(':')
+        state.stats['detail_requests'] += 1
+        return await serve_page(request, lambda: state.profile(user or params.get('user', '')).detail_page(cid))
+
+    user = params.get('user')
+    if not user:
+        return Response('Missing user parameter', status_code=400)
+    try:
+        cstart = int(params.get('cstart', 0))
+        pagesize = min(100, int(params.get('pagesize', 20)))
+    except ValueError:
+        return Response('Bad cstart/pagesize', status_code=400)
+    if request.method == 'POST':
+        # Parsed by hand: request.form() would need python-multipart
+        form = parse_qs((await request.body()).decode('utf-8', 'replace'))
+        if form.get('json') == ['1']:
+            state.stats['fragment_requests'] += 1
+            return await serve_page(
+                request,
+                lambda: json.dumps({'B': state.profile(user).listing_rows(cstart, pagesize)}),
+                media_type='application/json',
+            )
+    state.stats['listing_requests'] += 1
+    return await serve_page(request, lambda: state.profile(user).listing_page(cstart, pagesize))
+
+
+async def sorry(request: Request):
+    return HTMLResponse(SORRY_PAGE, status_code=429)
+
+
+async def mock_config(request: Request):
+    if request.method == 'POST':
+        try:
+            state.update(await request.json())
+        except (ValueError, TypeError) as e:
+            return JSONResponse({'error': str(e)}, status_code=400)
+    return JSONResponse(state.config)
+
+
+async def mock_stats(request: Request):
+    with state.lock:
+        blocked = sum(1 for until in state.blocked_until.values() if until > time.monotonic())
+        return JSONResponse({**state.stats, 'clients_blocked_now': blocked, 'config': state.config})
+
+
+async def mock_reset(request: Request):
+    with state.lock:
+        state.stats.clear()
+        state.windows.clear()
+        state.blocked_until.clear()
+    return JSONResponse({'status': 'reset'})
+
+
+app = Starlette(
+    routes=[
+        Route('/citations', citations, methods=['GET', 'POST']),
+        Route('/sorry/index', sorry, methods=['GET', 'POST']),
+        Route('/_mock/config', mock_config, methods=['GET', 'POST']),
+        Route('/_mock/stats', mock_stats, methods=['GET']),
+        Route('/_mock/reset', mock_reset, methods=['POST']),
+    ],
+)
+
+if __name__ == '__main__':
+    import uvicorn
+    port = int(os.environ.get('PORT', 9100))
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,205 @@
+"""
+Near-duplicate publication detection with MinHash and LSH
+Titles (character shingles) and author surnames are MinHashed; an LSH index
+over signature bands finds candidate matches without comparing every pair,
+and candidates are confirmed by exact Jaccard similarity. Titles must also
+agree on their numbers, roman numerals and negations, so "Part I"/"Part II",
+"GPT-3"/"GPT-4" or "is"/"is not" are never merged. Used to merge
+preprint/published copies and punctuation variants before detail pages are
+fetched; merged rows are kept on the surviving row as aliases.
+"""
+
+import json
+import os
+import re
+import zlib
+from collections import defaultdict
+
+import numpy as np
+
+NEAR_DUP_THRESHOLD = float(os.getenv("NEAR_DUP_THRESHOLD", "0.9"))
+NUM_PERM = 120
+# 24 bands of 5 rows: practically every pair at 0.9 similarity (~99% at 0.7) becomes a candidate, ~0.02% at 0.1
+LSH_BANDS = 24
+# Candidates whose signatures agree this much less than the threshold skip the exact check
+SIGNATURE_MARGIN = 0.15
+SHINGLE_SIZE = 3
+SIGNATURE_CHUNK = 2000  # rows MinHashed per numpy pass
+MERSENNE_PRIME = (1 << 31) - 1
+PREPRINT_MARKERS = ("arxiv", "preprint", "biorxiv", "medrxiv", "ssrn", "research square")
+# Title words that make otherwise similar titles different papers
+NEGATIONS = frozenset({"not", "no", "non", "without"})
+ROMAN_NUMERAL_RE = re.compile(r"^[ivx]{1,4}$")
+
+_rng = np.random.default_rng(1)
+_PERM_A = _rng.integers(1, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+_PERM_B = _rng.integers(0, MERSENNE_PRIME, size=NUM_PERM, dtype=np.uint64)
+
+
+def shingles(title, authors=""):
+    """Character shingles of the normalized title plus one token per author surname"""
+    text = " ".join(re.sub(r"[^0-9a-z]+", " ", str(title or "").lower()).split())
+    grams = {text[i:i + SHINGLE_SIZE] for i in range(max(1, len(text) - SHINGLE_SIZE + 1))}
+    for name in re.split(r"[,;]| and ", str(authors or "")):
+        parts = re.sub(r"[^a-z ]+", " ", name.lower()).split()
+        if parts:
+            grams.add(f"author:{parts[-1]}")
+    grams.discard("")
+    return grams
+
+
+def minhash(grams):
+    """NUM_PERM-value MinHash signature of a shingle set"""
+    if not grams:
+        return np.zeros(NUM_PERM, dtype=np.uint64)
+    hashes = np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+    hashes %= MERSENNE_PRIME
+    # (a*x + b) mod p for every permutation and shingle; a, b, x < 2**31 keep it within uint64
+    permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % MERSENNE_PRIME
+    return permuted.min(axis=1)
+
+
+def minhash_many(gram_sets):
+    """MinHash signatures for many shingle sets at once, as an (n, NUM_PERM) array"""
+    signatures = np.zeros((len(gram_sets), NUM_PERM), dtype=np.uint64)
+    for start in range(0, len(gram_sets), SIGNATURE_CHUNK):
+        chunk = gram_sets[start:start + SIGNATURE_CHUNK]
+        sizes = np.fromiter((len(grams) for grams in chunk), dtype=np.int64, count=len(chunk))
+        hashes = np.fromiter(
+            (zlib.crc32(g.encode("utf-8")) for grams in chunk for g in grams), dtype=np.uint64, count=int(sizes.sum())
+        )
+        nonempty = sizes > 0
+        if not hashes.size:
+            continue
+        hashes %= MERSENNE_PRIME
+        permuted = (_PERM_A[:, None] * hashes[None, :] + _PERM_B[:, None]) % MERSENNE_PRIME
+        offsets = np.concatenate(([0], np.cumsum(sizes[nonempty])[:-1]))
+        signatures[start + np.flatnonzero(nonempty)] = np.minimum.reduceat(permuted, offsets, axis=1).T
+    return signatures
+
+
+def distinguishing_tokens(title):
+    """Numbers, roman numerals and negations in a title; near-duplicates must share all of them"""
+    words = re.findall(r"[0-9]+|[a-z]+", str(title or "").lower())
+    return frozenset(w for w in words if w.isdigit() or ROMAN_NUMERAL_RE.match(w) or w in NEGATIONS)
+
+
+def jaccard(a, b):
+    return len(a & b) / len(a | b) if a or b else 1.0
+
+
+class NearDuplicateIndex:
+    """LSH index of publications; query() returns keys of near-duplicates already added"""
+
+    def __init__(self, threshold=NEAR_DUP_THRESHOLD, bands=LSH_BANDS):
+        self.threshold = threshold
+        self.bands = bands
+        self.rows_per_band = NUM_PERM // bands
+        self.buckets = defaultdict(list)
+        self.shingle_sets = {}
+        self.signatures = {}
+
+    def band_keys(self, signature):
+        r = self.rows_per_band
+        return [(band, signature[band * r:(band + 1) * r].tobytes()) for band in range(self.bands)]
+
+    def query(self, title, authors="", grams=None, signature=None):
+        grams = grams if grams is not None else shingles(title, authors)
+        signature = signature if signature is not None else minhash(grams)
+        candidates = set()
+        for band_key in self.band_keys(signature):
+            candidates.update(self.buckets.get(band_key, ()))
+        if not candidates:
+            return []
+        candidates = list(candidates)
+        # Signature agreement estimates Jaccard; only plausible matches get the exact set comparison
+        agreement = (np.stack([self.signatures[key] for key in candidates]) == signature).mean(axis=1)
+        return [
+            key for key, estimate in zip(candidates, agreement)
+            if estimate >= self.threshold - SIGNATURE_MARGIN and jaccard(grams, self.shingle_sets[key]) >= self.threshold
+        ]
+
+    def add(self, key, title, authors="", grams=None, signature=None):
+        grams = grams if grams is not None else shingles(title, authors)
+        signature = signature if signature is not None else minhash(grams)
+        self.shingle_sets[key] = grams
+        self.signatures[key] = signature
+        for band_key in self.band_keys(signature):
+            self.buckets[band_key].append(key)
+
+
+def is_preprint(row):
+    venue = str(row.get("Venue") or "").lower()
+    return any(marker in venue for marker in PREPRINT_MARKERS)
+
+
+def citation_count(row):
+    try:
+        return int(row.get("Citation Count") or 0)
+    except (TypeError, ValueError):
+        return 0
+
+
+def aliases(row):
+    """[{"Title", "Scholar URL", "Citation Count"}] of the rows merged into this one"""
+    value = row.get("Aliases")
+    return json.loads(value) if isinstance(value, str) and value else []
+
+
+def merge_into(target, row):
+    """
+    Fold a near-duplicate row into the kept one as an alias. The kept row's
+    citation count is its own (the count belongs to its citation ID); each
+    alias carries its own, updated when the alias is seen again.
+    """
+    merged = aliases(target)
+    by_key = {(alias.get("Title"), alias.get("Scholar URL")): alias for alias in merged}
+    own = {"Title": row.get("Title"), "Scholar URL": row.get("Scholar URL"), "Citation Count": citation_count(row)}
+    for alias in [own] + aliases(row):
+        key = (alias.get("Title"), alias.get("Scholar URL"))
+        if key == (target.get("Title"), target.get("Scholar URL")):
+            continue
+        if key in by_key:
+            by_key[key].update(alias)
+        else:
+            by_key[key] = alias
+            merged.append(alias)
+    target["Aliases"] = json.dumps(merged)
+
+
+def merge_near_duplicates(candidates, existing=(), threshold=NEAR_DUP_THRESHOLD):
+    """
+    Collapse near-duplicate scraper rows before their detail pages are fetched.
+    A candidate matching an existing row is merged into that row; among
+    candidates, the published version (then the most cited) of each cluster
+    is kept. Merged rows are recorded in the kept row's "Aliases" (JSON list
+    of title, Scholar URL and citation count); the kept row's own citation
+    count is left as listed. Returns (kept candidates, merged_count).
+    """
+    index = NearDuplicateIndex(threshold)
+    existing = list(existing)
+    guards = {}
+    for i, row in enumerate(existing):
+        index.add(("existing", i), row.get("Title"), row.get("Authors"))
+        guards[("existing", i)] = distinguishing_tokens(row.get("Title"))
+
+    order = sorted(range(len(candidates)), key=lambda i: (is_preprint(candidates[i]), -citation_count(candidates[i])))
+    gram_sets = [shingles(row.get("Title"), row.get("Authors")) for row in candidates]
+    signatures = minhash_many(gram_sets)
+    kept = {}
+    for i in order:
+        row = candidates[i]
+        grams, signature = gram_sets[i], signatures[i]
+        guard = distinguishing_tokens(row.get("Title"))
+        matches = [key for key in index.query(None, grams=grams, signature=signature) if guards[key] == guard]
+        if matches:
+            # Prefer an already stored row, then the earliest kept candidate
+            kind, j = min(matches, key=lambda key: (key[0] != "existing", key[1]))
+            merge_into(existing[j] if kind == "existing" else kept[j], row)
+            continue
+        kept[i] = row
+        index.add(("candidate", i), None, grams=grams, signature=signature)
+        guards[("candidate", i)] = guard
+
+    # Keep the listing order of the survivors
+    return [kept[i] for i in sorted(kept)], len(candidates) - len(kept)
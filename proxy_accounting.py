@@ -0,0 +1,323 @@
+"""
+Proxy usage, cost and budgets
+Every Scholar request records its provider, page kind, response bytes and
+whether it was a retry, per run and author, in a small SQLite database.
+Per-request and per-GB prices turn that into spend, checked against daily
+and per-run budgets before each request (BudgetExceeded lets callers stop
+and keep what they have). Observed page sizes feed pre-run estimates, and
+downloads cut short (streamed detail pages) record the bytes they skipped.
+
+The current run is a context variable, so concurrent runs (e.g. Streamlit
+sessions, each on its own thread) are accounted separately; worker threads
+join their caller's run when started with contextvars.copy_context().run.
+
+Usage:
+    python proxy_accounting.py --days 7
+"""
+
+import argparse
+import contextvars
+import os
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+PROXY_USAGE_DB = os.getenv("PROXY_USAGE_DB", "proxy_usage.db")
+# Spend limits in USD; 0 means no limit
+PROXY_DAILY_BUDGET = float(os.getenv("PROXY_DAILY_BUDGET", "0"))
+PROXY_RUN_BUDGET = float(os.getenv("PROXY_RUN_BUDGET", "0"))
+
+# (billing unit, price) per provider; set these to your plan's rates
+PROVIDER_PRICING = {
+    "scraperapi": ("request", float(os.getenv("SCRAPERAPI_COST_PER_REQUEST", "0.00049"))),
+    "decodo": ("gb", float(os.getenv("DECODO_COST_PER_GB", "3.5"))),
+    "luminati": ("gb", float(os.getenv("BRIGHTDATA_COST_PER_GB", "8.4"))),
+    "brightdata": ("gb", float(os.getenv("BRIGHTDATA_COST_PER_GB", "8.4"))),
+    "smartproxy": ("gb", float(os.getenv("SMARTPROXY_COST_PER_GB", "3.5"))),
+}
+GB = 1024 ** 3
+
+# Page sizes used for estimates until real pages have been seen
+DEFAULT_PAGE_BYTES = {"listing": 125_000, "detail": 55_000, "other": 50_000}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS usage (
+    day TEXT NOT NULL,
+    run_id TEXT NOT NULL,
+    author_id TEXT NOT NULL,
+    provider TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    requests INTEGER NOT NULL,
+    bytes INTEGER NOT NULL,
+    retries INTEGER NOT NULL,
+    cost REAL NOT NULL,
+    saved_bytes INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, run_id, provider, kind)
+) WITHOUT ROWID;
+"""
+
+
+class BudgetExceeded(RuntimeError):
+    """Raised before a request that would go over the daily or per-run budget"""
+
+
+def request_cost(provider, nbytes, billable=True):
+    unit, price = PROVIDER_PRICING.get(provider, ("free", 0.0))
+    if unit == "request":
+        return price if billable else 0.0
+    if unit == "gb":
+        return price * nbytes / GB
+    return 0.0
+
+
+def page_kind(url):
+    if "view_op=view_citation" in (url or ""):
+        return "detail"
+    if "/citations" in (url or ""):
+        return "listing"
+    return "other"
+
+
+def response_bytes(res, body_bytes=None):
+    """
+    Bytes on the wire for a requests/httpx response: headers plus the (possibly
+    compressed) body, or plus body_bytes for a body that was only partly read
+    """
+    header_bytes = sum(len(k) + len(v) + 4 for k, v in res.headers.items())
+    if body_bytes is not None:
+        return header_bytes + body_bytes
+    length = res.headers.get("content-length")
+    if length and length.isdigit():
+        return header_bytes + int(length)
+    return header_bytes + len(res.content)
+
+
+def response_hook(provider):
+    """httpx response event hook that records every response of a client against provider"""
+    def hook(response):
+        # Event hooks run before the body is read
+        response.read()
+        # Only per-request providers look at billable; ScraperAPI charges for 200/404 only
+        get_accountant().record(provider, page_kind(str(response.url)), response_bytes(response),
+                                billable=response.status_code in (200, 404))
+    return hook
+
+
+class UsageRun:
+    """Requests, bytes and spend of one run, per (provider, kind)"""
+
+    def __init__(self, author_id="", budget=PROXY_RUN_BUDGET):
+        self.run_id = uuid.uuid4().hex[:12]
+        self.author_id = author_id or ""
+        self.budget = budget
+        self.lock = threading.Lock()
+        self.usage = {}
+
+    def add(self, provider, kind, nbytes, retry, cost, saved_bytes):
+        with self.lock:
+            entry = self.usage.setdefault(
+                (provider, kind), {"requests": 0, "bytes": 0, "retries": 0, "cost": 0.0, "saved_bytes": 0}
+            )
+            entry["requests"] += 1
+            entry["bytes"] += int(nbytes)
+            entry["retries"] += int(retry)
+            entry["cost"] += cost
+            entry["saved_bytes"] += int(saved_bytes)
+
+    def cost(self):
+        with self.lock:
+            return sum(entry["cost"] for entry in self.usage.values())
+
+
+_current_run = contextvars.ContextVar("proxy_usage_run", default=None)
+
+
+def current_run():
+    """The usage run of the calling context, or None outside usage_run()"""
+    return _current_run.get()
+
+
+class ProxyAccountant:
+    def __init__(self, path=PROXY_USAGE_DB, daily_budget=PROXY_DAILY_BUDGET):
+        self.path = path
+        self.daily_budget = daily_budget
+        self.lock = threading.Lock()
+        # check_same_thread=False: the app and the fleet record from worker threads, under self.lock
+        self.conn = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        self.conn.executescript(SCHEMA)
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(usage)")}
+        if "saved_bytes" not in columns:
+            with self.conn:
+                self.conn.execute("ALTER TABLE usage ADD COLUMN saved_bytes INTEGER NOT NULL DEFAULT 0")
+
+    def spent_today(self):
+        """Spend recorded today, read from the database so other processes' runs count too"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT COALESCE(SUM(cost), 0) FROM usage WHERE day = ?", (date.today().isoformat(),)
+            ).fetchone()[0]
+
+    def check_budget(self, provider):
+        """Raise BudgetExceeded if a paid provider is already at a budget limit"""
+        if PROVIDER_PRICING.get(provider, ("free", 0.0))[1] <= 0:
+            return
+        if self.daily_budget and self.spent_today() >= self.daily_budget:
+            raise BudgetExceeded(f"daily proxy budget of ${self.daily_budget:.2f} used up")
+        run = current_run()
+        if run is not None and run.budget and run.cost() >= run.budget:
+            raise BudgetExceeded(f"run proxy budget of ${run.budget:.2f} used up")
+
+    def record(self, provider, kind, nbytes, retry=False, billable=True, saved_bytes=0):
+        """Account one request to the current run; saved_bytes is what a download cut short did not transfer"""
+        cost = request_cost(provider, nbytes, billable)
+        run = current_run()
+        if run is not None:
+            run.add(provider, kind, nbytes, retry, cost, saved_bytes)
+        row = (date.today().isoformat(), run.run_id if run else "-", run.author_id if run else "", provider, kind,
+               1, int(nbytes), int(retry), cost, int(saved_bytes))
+        with self.lock:
+            with self.conn:
+                self.conn.execute(
+                    "INSERT INTO usage (day, run_id, author_id, provider, kind, requests, bytes, retries, cost, "
+                    "saved_bytes) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(day, run_id, provider, kind) DO UPDATE SET "
+                    "requests = requests + excluded.requests, bytes = bytes + excluded.bytes, "
+                    "retries = retries + excluded.retries, cost = cost + excluded.cost, "
+                    "saved_bytes = saved_bytes + excluded.saved_bytes",
+                    row,
+                )
+
+    def average_page_bytes(self, kind, provider=None):
+        """Average full size of a page of this kind; pages cut short count with the bytes they skipped"""
+        sql = "SELECT SUM(bytes + saved_bytes), SUM(requests) FROM usage WHERE kind = ? AND bytes > 0"
+        params = [kind]
+        if provider:
+            sql += " AND provider = ?"
+            params.append(provider)
+        with self.lock:
+            total, requests = self.conn.execute(sql, params).fetchone()
+        return total / requests if requests else DEFAULT_PAGE_BYTES.get(kind, DEFAULT_PAGE_BYTES["other"])
+
+    def estimate(self, provider, listing_pages, detail_pages):
+        """Requests, bytes and cost of a run with and without abstracts"""
+        listing_bytes = listing_pages * self.average_page_bytes("listing")
+        detail_bytes = detail_pages * self.average_page_bytes("detail")
+
+        def option(requests, nbytes):
+            unit, price = PROVIDER_PRICING.get(provider, ("free", 0.0))
+            cost = price * requests if unit == "request" else price * nbytes / GB if unit == "gb" else 0.0
+            return {"requests": requests, "mb": round(nbytes / 2 ** 20, 2), "cost": round(cost, 4)}
+
+        return {
+            "provider": provider,
+            "with_abstracts": option(listing_pages + detail_pages, listing_bytes + detail_bytes),
+            "without_abstracts": option(listing_pages, listing_bytes),
+            "spent_today": round(self.spent_today(), 4),
+            "daily_budget": self.daily_budget,
+            "run_budget": current_run().budget if current_run() else PROXY_RUN_BUDGET,
+        }
+
+    def report(self, days=1, group_by=("day", "provider")):
+        """Usage rows for the last `days` days, grouped by any of day/run_id/author_id/provider/kind"""
+        columns = ", ".join(group_by)
+        since = (date.today() - timedelta(days=days - 1)).isoformat()
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {columns}, SUM(requests), SUM(bytes), SUM(retries), SUM(cost), SUM(saved_bytes) "
+                f"FROM usage WHERE day >= ? GROUP BY {columns} ORDER BY {columns}",
+                (since,),
+            ).fetchall()
+        return [
+            {**dict(zip(group_by, row)), "requests": row[-5], "mb": round(row[-4] / 2 ** 20, 2),
+             "retries": row[-3], "cost": round(row[-2], 4), "saved_mb": round(row[-1] / 2 ** 20, 2)}
+            for row in rows
+        ]
+
+
+def format_option(option):
+    return f"{option['requests']} requests, {option['mb']:.1f} MB, ${option['cost']:.4f}"
+
+
+def format_estimate(estimate):
+    lines = [
+        f"Estimated proxy cost via {estimate['provider']}:",
+        f"  with abstracts:    {format_option(estimate['with_abstracts'])}",
+        f"  without abstracts: {format_option(estimate['without_abstracts'])}",
+        f"  spent today: ${estimate['spent_today']:.4f}"
+        + (f" of ${estimate['daily_budget']:.2f}" if estimate["daily_budget"] else "")
+        + (f"; run budget ${estimate['run_budget']:.2f}" if estimate["run_budget"] else ""),
+    ]
+    return "\n".join(lines)
+
+
+def format_usage(usage):
+    lines = [f"{'provider':<14}{'kind':<9}{'requests':>9}{'MB':>9}{'saved MB':>10}{'retries':>9}{'cost $':>10}"]
+    for (provider, kind), entry in sorted(usage.items()):
+        lines.append(
+            f"{provider:<14}{kind:<9}{entry['requests']:>9}{entry['bytes'] / 2 ** 20:>9.2f}"
+            f"{entry['saved_bytes'] / 2 ** 20:>10.2f}{entry['retries']:>9}{entry['cost']:>10.4f}"
+        )
+    return "\n".join(lines)
+
+
+# Shared instance for the scraper and the app
+_accountant = None
+
+
+def get_accountant() -> ProxyAccountant:
+    global _accountant
+    if _accountant is None:
+        _accountant = ProxyAccountant()
+    return _accountant
+
+
+@contextmanager
+def usage_run(author_id="", budget=PROXY_RUN_BUDGET):
+    """
+    Account requests made in this block (in this context) to one UsageRun and
+    yield it; prints its usage at the end. Inside a run already active in the
+    same context, yields that run.
+    """
+    outer = current_run()
+    if outer is not None:
+        yield outer
+        return
+    run = UsageRun(author_id, budget)
+    token = _current_run.set(run)
+    try:
+        yield run
+    finally:
+        _current_run.reset(token)
+        if run.usage:
+            print("Proxy usage for this run:")
+            print(format_usage(run.usage))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--days", type=int, default=1)
+    parser.add_argument("--by", default="day,provider",
+                        help="Comma-separated grouping: day, run_id, author_id, provider, kind")
+    parser.add_argument("--db", default=PROXY_USAGE_DB)
+    args = parser.parse_args()
+
+    group_by = tuple(col.strip() for col in args.by.split(",") if col.strip())
+    allowed = {"day", "run_id", "author_id", "provider", "kind"}
+    if not group_by or set(group_by) - allowed:
+        raise SystemExit(f"--by takes columns from: {', '.join(sorted(allowed))}")
+
+    accountant = ProxyAccountant(args.db)
+    rows = accountant.report(args.days, group_by)
+    if not rows:
+        print("No proxy usage recorded.")
+        return
+    for row in rows:
+        print("  ".join(f"{key}={value}" for key, value in row.items()))
+    print(f"Spent today: ${accountant.spent_today():.4f}"
+          + (f" of ${accountant.daily_budget:.2f}" if accountant.daily_budget else ""))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,237 @@
+"""
+Client-side view of a fleet of simple_proxy_server.py nodes
+LOCAL_PROXY_URL may list several nodes (comma-separated); requests are spread
+across them using each node's /health, and nodes that start returning block
+pages are taken out of rotation for a while.
+"""
+
+import contextvars
+import hashlib
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+import requests
+
+# 'least_loaded' picks the node with the fewest requests in flight or queued;
+# 'hash' sends each URL to the same node (rendezvous hashing), which keeps the
+# nodes' response caches disjoint
+FLEET_STRATEGY = os.getenv('PROXY_FLEET_STRATEGY', 'least_loaded').lower()
+FLEET_HEALTH_TTL = float(os.getenv('PROXY_FLEET_HEALTH_TTL', '15'))
+FLEET_HEALTH_TIMEOUT = float(os.getenv('PROXY_FLEET_HEALTH_TIMEOUT', '3'))
+# How long a node sits out after serving a block page or failing its health check
+FLEET_BLOCK_COOLDOWN = float(os.getenv('PROXY_FLEET_BLOCK_COOLDOWN', '600'))
+FLEET_DOWN_COOLDOWN = float(os.getenv('PROXY_FLEET_DOWN_COOLDOWN', '60'))
+
+
+def parse_proxy_nodes(value):
+    """Split a comma-separated LOCAL_PROXY_URL into node base URLs"""
+    return [node.strip().rstrip('/') for node in (value or '').split(',') if node.strip()]
+
+
+class ProxyFleet:
+    """
+    Node selection for several proxy-service deployments. Each node's load is
+    what its /health last reported plus the requests this process has open on it.
+    """
+
+    def __init__(self, nodes, strategy=FLEET_STRATEGY):
+        self.nodes = list(nodes)
+        self.strategy = strategy
+        self.lock = threading.Lock()
+        self.checked_at = 0.0
+        self.state = {
+            node: {'in_flight': 0, 'remote_load': 0, 'cooldown_until': 0.0,
+                   'success': 0, 'failure': 0, 'blocked': 0}
+            for node in self.nodes
+        }
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def check_node(self, node):
+        try:
+            res = requests.get(f"{node}/health", timeout=FLEET_HEALTH_TIMEOUT)
+            res.raise_for_status()
+            return res.json()
+        except Exception:
+            return None
+
+    def refresh_health(self, force=False):
+        """Poll every node's /health in parallel, at most once per FLEET_HEALTH_TTL"""
+        if not self.nodes or (not force and time.time() - self.checked_at < FLEET_HEALTH_TTL):
+            return
+        self.checked_at = time.time()
+        with ThreadPoolExecutor(max_workers=len(self.nodes)) as pool:
+            reports = dict(zip(self.nodes, pool.map(self.check_node, self.nodes)))
+
+        now = time.time()
+        with self.lock:
+            for node, report in reports.items():
+                state = self.state[node]
+                if report is None:
+                    state['cooldown_until'] = max(state['cooldown_until'], now + FLEET_DOWN_COOLDOWN)
+                    continue
+                load = report.get('load', {})
+                state['remote_load'] = load.get('upstream_in_flight', 0) + load.get('waiting', 0)
+                block_age = load.get('last_block_age_seconds')
+                if block_age is not None and block_age < FLEET_BLOCK_COOLDOWN:
+                    # The node saw a block page recently, whoever it was serving
+                    state['cooldown_until'] = max(state['cooldown_until'], now + FLEET_BLOCK_COOLDOWN - block_age)
+
+    def load(self, node):
+        state = self.state[node]
+        return state['remote_load'] + state['in_flight']
+
+    def available(self, exclude=()):
+        now = time.time()
+        return [n for n in self.nodes if n not in exclude and self.state[n]['cooldown_until'] <= now]
+
+    def choose(self, key=None, exclude=()):
+        """Pick a node for this request, or None when every node is excluded or cooling down"""
+        self.refresh_health()
+        with self.lock:
+            ready = self.available(exclude)
+            if not ready:
+                return None
+            if self.strategy == 'hash' and key is not None:
+                return max(ready, key=lambda n: hashlib.md5(f"{n}|{key}".encode()).digest())
+            lowest = min(self.load(n) for n in ready)
+            return random.choice([n for n in ready if self.load(n) == lowest])
+
+    def assign(self, urls, exclude=()):
+        """Split a list of URLs across the available nodes; returns {node: [urls]}"""
+        self.refresh_health()
+        with self.lock:
+            ready = self.available(exclude)
+            if not ready:
+                return {}
+            plan = {node: [] for node in ready}
+            if self.strategy == 'hash':
+                for url in urls:
+                    plan[max(ready, key=lambda n: hashlib.md5(f"{n}|{url}".encode()).digest())].append(url)
+            else:
+                # Hand each URL to whichever node would have the least work after taking it
+                for url in urls:
+                    node = min(ready, key=lambda n: self.load(n) + len(plan[n]))
+                    plan[node].append(url)
+            return {node: batch for node, batch in plan.items() if batch}
+
+    @contextmanager
+    def track(self, node):
+        """Count a request as in flight on this node while the block runs"""
+        with self.lock:
+            self.state[node]['in_flight'] += 1
+        try:
+            yield
+        finally:
+            with self.lock:
+                self.state[node]['in_flight'] -= 1
+
+    def record_success(self, node):
+        with self.lock:
+            self.state[node]['success'] += 1
+
+    def record_failure(self, node):
+        with self.lock:
+            state = self.state[node]
+            state['failure'] += 1
+            state['cooldown_until'] = max(state['cooldown_until'], time.time() + FLEET_DOWN_COOLDOWN)
+
+    def record_block(self, node):
+        with self.lock:
+            state = self.state[node]
+            state['blocked'] += 1
+            state['cooldown_until'] = time.time() + FLEET_BLOCK_COOLDOWN
+
+    def iter_batch(self, urls, fetch_batch, max_rounds=None):
+        """
+        Fetch URLs through every available node at once. fetch_batch(node, urls)
+        must yield /batch records; a node whose records turn into block pages is
+        dropped and its unfinished URLs go to the remaining nodes next round.
+        Yields (node, record) for each page that got an upstream answer.
+        """
+        pending = list(dict.fromkeys(urls))
+        rounds = 0
+        dropped = set()
+        while pending and rounds < (max_rounds or len(self.nodes)):
+            rounds += 1
+            plan = self.assign(pending, exclude=dropped)
+            if not plan:
+                break
+
+            results = queue.Queue()
+
+            def run(node, batch):
+                records = None
+                try:
+                    with self.track(node):
+                        records = fetch_batch(node, batch)
+                        for record in records:
+                            results.put((node, record))
+                            if record.get('blocked'):
+                                # Stop using this node; leftovers move to the others
+                                break
+                except Exception as err:
+                    results.put((node, {'error': str(err)}))
+                finally:
+                    if hasattr(records, 'close'):
+                        records.close()
+                    results.put((node, None))
+
+            # Workers run in a copy of the caller's context, so their requests count toward the caller's run
+            workers = [
+                threading.Thread(target=contextvars.copy_context().run, args=(run, *item), daemon=True)
+                for item in plan.items()
+            ]
+            for worker in workers:
+                worker.start()
+
+            done = set()
+            finished = 0
+            while finished < len(workers):
+                node, record = results.get()
+                if record is None:
+                    finished += 1
+                elif record.get('blocked'):
+                    self.record_block(node)
+                    dropped.add(node)
+                elif 'error' in record and 'url' not in record:
+                    self.record_failure(node)
+                    dropped.add(node)
+                elif record.get('status') is not None:
+                    if record['status'] == 200:
+                        self.record_success(node)
+                    done.add(record['url'])
+                    yield node, record
+            pending = [url for url in pending if url not in done]
+
+    def summary(self):
+        now = time.time()
+        with self.lock:
+            return {
+                node: {
+                    'load': self.load(node),
+                    'success': state['success'],
+                    'failure': state['failure'],
+                    'blocked': state['blocked'],
+                    'cooling_down_s': max(0, round(state['cooldown_until'] - now)),
+                }
+                for node, state in self.state.items()
+            }
+
+
+# Shared instance built from LOCAL_PROXY_URL
+_proxy_fleet = None
+
+
+def get_proxy_fleet() -> ProxyFleet:
+    """Get or create the fleet for the nodes listed in LOCAL_PROXY_URL"""
+    global _proxy_fleet
+    if _proxy_fleet is None:
+        _proxy_fleet = ProxyFleet(parse_proxy_nodes(os.getenv('LOCAL_PROXY_URL', '')))
+    return _proxy_fleet
@@ -0,0 +1,37 @@
+"""
+Keys that identify a scraped publication across runs
+Shared by the scraper, the citation history and the search index.
+"""
+
+from urllib.parse import urlsplit, parse_qs
+
+
+def normalize_title(txt):
+    if not isinstance(txt, str):
+        return ""
+    return " ".join(txt.strip().lower().split())
+
+
+def citation_id(scholar_url):
+    """Scholar's stable publication ID (citation_for_view=USER:PUB) from a detail URL"""
+    if not isinstance(scholar_url, str) or scholar_url == "N/A":
+        return None
+    values = parse_qs(urlsplit(scholar_url).query).get("citation_for_view")
+    return values[0] if values else None
+
+
+def citation_owner(cid):
+    """Profile user a citation ID (USER:PUB) was listed under, or None"""
+    if not isinstance(cid, str) or ":" not in cid:
+        return None
+    return cid.split(":", 1)[0]
+
+
+def owned_by(row, author_id):
+    """Whether a scraped row came from author_id's profile, judged by its citation ID"""
+    cid = row.get("Citation ID") or citation_id(row.get("Scholar URL"))
+    return citation_owner(cid) == author_id
+
+
+def row_key(row):
+    return citation_id(row.get("Scholar URL")) or normalize_title(row.get("Title"))
@@ -0,0 +1,149 @@
+"""
+Parallel scholarly.fill() for publications
+Each worker fills on its own copy of scholarly's Navigator (separate HTTP
+clients, shared proxy settings); a shared pacer keeps fill starts spaced out.
+"""
+
+import contextvars
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from queue import Queue
+
+import httpx
+
+# Publications filled at once, and the longest a single fill may take before it is skipped
+FILL_CONCURRENCY = max(1, int(os.getenv('FILL_CONCURRENCY', '3')))
+FILL_TIMEOUT = float(os.getenv('FILL_TIMEOUT', '90'))
+FILL_DELAY_MIN = 0.5
+FILL_DELAY_MAX = 1.5
+
+
+class FillPacer:
+    """Spaces fill() starts across all workers by FILL_DELAY_MIN..FILL_DELAY_MAX seconds."""
+
+    def __init__(self, min_delay=FILL_DELAY_MIN, max_delay=FILL_DELAY_MAX):
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+
+    def wait(self):
+        # Reserve the next start slot under the lock, sleep outside it
+        with self.lock:
+            now = time.monotonic()
+            start = max(now, self.next_start)
+            self.next_start = start + random.uniform(self.min_delay, self.max_delay)
+        if start > now:
+            time.sleep(start - now)
+
+
+def clone_scholarly_navigator():
+    """
+    Copy scholarly's singleton Navigator with its own HTTP clients, so fills can
+    run in parallel. Proxy generators stay shared; session resets only touch the copy.
+    """
+    from scholarly._navigator import Navigator
+
+    base = Navigator()
+    nav = object.__new__(Navigator)  # bypasses the Singleton metaclass
+    nav.__dict__.update(base.__dict__)
+
+    def build_client(pm, template):
+        kwargs = {'follow_redirects': True, 'headers': dict(template.headers) if template else {}}
+        if template:
+            # Keeps hooks such as proxy accounting's response_hook on the copy
+            kwargs['event_hooks'] = {name: list(hooks) for name, hooks in template.event_hooks.items()}
+        proxies = getattr(pm, '_proxies', None) or {}
+        verify = getattr(pm.proxy_mode, 'name', '') != 'SCRAPERAPI'
+        kwargs['verify'] = verify
+        if getattr(pm, '_proxy_works', False) and proxies:
+            kwargs['mounts'] = {
+                scheme: httpx.HTTPTransport(proxy=url, verify=verify) for scheme, url in proxies.items()
+            }
+        return httpx.Client(**kwargs)
+
+    def new_session(premium=True, **kwargs):
+        if premium:
+            nav._session1.close()
+            nav._session1 = build_client(nav.pm1, nav._session1)
+        else:
+            nav._session2.close()
+            nav._session2 = build_client(nav.pm2, nav._session2)
+
+    nav._session1 = build_client(base.pm1, base._session1)
+    nav._session2 = build_client(base.pm2, base._session2)
+    nav._new_session = new_session
+    return nav
+
+
+def scholarly_provider():
+    """Paid provider scholarly's proxy bills to (a generator with a `provider`), or None"""
+    from scholarly._navigator import Navigator
+
+    return getattr(getattr(Navigator(), 'pm1', None), 'provider', None)
+
+
+def fill_concurrently(pubs, concurrency=FILL_CONCURRENCY, timeout=FILL_TIMEOUT, on_fallback=None, before_fill=None):
+    """
+    Fill publications on up to `concurrency` navigator copies and yield
+    (index, filled_pub, error) in completion order, on the caller's thread.
+    A fill that runs past `timeout` is yielded as an error; its thread
+    finishes in the background. before_fill() runs in the worker ahead of
+    each fill; if it raises (e.g. BudgetExceeded), that publication is not
+    filled and the exception is yielded as its error.
+    """
+    from scholarly import scholarly
+    from scholarly.publication_parser import PublicationParser
+
+    if not pubs:
+        return
+    navigators = Queue()
+    try:
+        for _ in range(min(concurrency, len(pubs))):
+            navigators.put(clone_scholarly_navigator())
+    except Exception as clone_error:
+        # Private scholarly API changed: fall back to one fill at a time on the shared session
+        if on_fallback:
+            on_fallback(clone_error)
+        navigators = None
+
+    pacer = FillPacer()
+    started_at = {}
+
+    def fill_one(index, pub):
+        if before_fill:
+            before_fill()
+        nav = navigators.get() if navigators else None
+        try:
+            pacer.wait()
+            started_at[index] = time.monotonic()
+            if nav is None:
+                return scholarly.fill(pub)
+            return PublicationParser(nav).fill(pub)
+        finally:
+            if nav is not None:
+                navigators.put(nav)
+
+    executor = ThreadPoolExecutor(max_workers=concurrency if navigators else 1)
+    try:
+        # Each worker runs in a copy of the caller's context, so its work counts toward the caller's run
+        pending = {executor.submit(contextvars.copy_context().run, fill_one, i, pub): i for i, pub in enumerate(pubs)}
+        while pending:
+            done, _ = wait(pending, timeout=1.0, return_when=FIRST_COMPLETED)
+            for future in done:
+                i = pending.pop(future)
+                try:
+                    yield i, future.result(), None
+                except Exception as pub_error:
+                    yield i, None, str(pub_error)
+
+            now = time.monotonic()
+            for future, i in list(pending.items()):
+                if i in started_at and now - started_at[i] > timeout:
+                    pending.pop(future)
+                    yield i, None, f"no response after {timeout:.0f}s"
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
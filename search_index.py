@@ -0,0 +1,176 @@
+"""
+Full-text search over scraped publications
+Rows are indexed into SQLite FTS5 from the scraper CSV when the app searches,
+or on every save with SEARCH_INDEX_ON_SAVE (unchanged rows are skipped by
+content hash), and searches are ranked with BM25, weighting
+title over authors, venue and abstract.
+"""
+
+import hashlib
+import os
+import re
+import sqlite3
+
+import pandas as pd
+
+from publication_keys import row_key
+
+SEARCH_INDEX_DB = os.getenv("SEARCH_INDEX_DB", "scholar_search.db")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS papers (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    title TEXT,
+    authors TEXT,
+    venue TEXT,
+    year INTEGER,
+    citations INTEGER,
+    url TEXT,
+    abstract TEXT,
+    content_hash TEXT
+);
+CREATE INDEX IF NOT EXISTS papers_year ON papers (year);
+CREATE VIRTUAL TABLE IF NOT EXISTS papers_fts USING fts5(
+    title, authors, venue, abstract,
+    content='papers', content_rowid='id', tokenize='porter unicode61'
+);
+CREATE TRIGGER IF NOT EXISTS papers_ai AFTER INSERT ON papers BEGIN
+    INSERT INTO papers_fts (rowid, title, authors, venue, abstract)
+    VALUES (new.id, new.title, new.authors, new.venue, new.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_ad AFTER DELETE ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, authors, venue, abstract)
+    VALUES ('delete', old.id, old.title, old.authors, old.venue, old.abstract);
+END;
+CREATE TRIGGER IF NOT EXISTS papers_au AFTER UPDATE ON papers BEGIN
+    INSERT INTO papers_fts (papers_fts, rowid, title, authors, venue, abstract)
+    VALUES ('delete', old.id, old.title, old.authors, old.venue, old.abstract);
+    INSERT INTO papers_fts (rowid, title, authors, venue, abstract)
+    VALUES (new.id, new.title, new.authors, new.venue, new.abstract);
+END;
+CREATE TABLE IF NOT EXISTS index_meta (name TEXT PRIMARY KEY, value TEXT);
+"""
+
+# bm25() column weights: title, authors, venue, abstract
+RANK_WEIGHTS = (10.0, 3.0, 1.0, 1.0)
+
+
+def text(value):
+    return "" if value is None or (isinstance(value, float) and pd.isna(value)) else str(value)
+
+
+def number(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def match_terms(query):
+    """User text to an FTS5 query: every word must match, last one as a prefix"""
+    words = re.findall(r"\w+", query or "")
+    if not words:
+        return ""
+    terms = [f'"{w}"' for w in words[:-1]] + [f'"{words[-1]}"*']
+    return " ".join(terms)
+
+
+class SearchIndex:
+    def __init__(self, path=SEARCH_INDEX_DB):
+        self.conn = sqlite3.connect(path)
+        self.conn.executescript(SCHEMA)
+
+    def close(self):
+        self.conn.close()
+
+    def upsert_rows(self, rows):
+        """Index scraper rows; rows whose content has not changed are skipped. Returns rows written."""
+        stored = dict(self.conn.execute("SELECT key, content_hash FROM papers"))
+        written = 0
+        with self.conn:
+            for row in rows:
+                values = (
+                    text(row.get("Title")), text(row.get("Authors")), text(row.get("Venue")),
+                    number(row.get("Year")), number(row.get("Citation Count")),
+                    text(row.get("Scholar URL")), text(row.get("Abstract")),
+                )
+                key = row_key(row)
+                if not key:
+                    continue
+                content_hash = hashlib.sha1(repr(values).encode("utf-8")).hexdigest()
+                if stored.get(key) == content_hash:
+                    continue
+                self.conn.execute(
+                    "INSERT INTO papers (key, title, authors, venue, year, citations, url, abstract, content_hash) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?) "
+                    "ON CONFLICT(key) DO UPDATE SET title = excluded.title, authors = excluded.authors, "
+                    "venue = excluded.venue, year = excluded.year, citations = excluded.citations, "
+                    "url = excluded.url, abstract = excluded.abstract, content_hash = excluded.content_hash",
+                    (key, *values, content_hash),
+                )
+                stored[key] = content_hash
+                written += 1
+        return written
+
+    def refresh_from_csv(self, csv_path):
+        """Index a scraper CSV if it changed since it was last indexed"""
+        if not os.path.exists(csv_path):
+            return 0
+        mtime = str(os.path.getmtime(csv_path))
+        meta_key = f"csv_mtime:{os.path.abspath(csv_path)}"
+        row = self.conn.execute("SELECT value FROM index_meta WHERE name = ?", (meta_key,)).fetchone()
+        if row and row[0] == mtime:
+            return 0
+        written = self.upsert_rows(pd.read_csv(csv_path).to_dict(orient="records"))
+        with self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO index_meta VALUES (?, ?)", (meta_key, mtime))
+        return written
+
+    def search(self, query="", author="", year_from=None, year_to=None, limit=20):
+        """Ranked matches for keywords, optionally limited to an author name and year range"""
+        clauses = []
+        keywords = match_terms(query)
+        if keywords:
+            clauses.append(f"({keywords})")
+        author_terms = match_terms(author)
+        if author_terms:
+            clauses.append(f"authors : ({author_terms})")
+        if not clauses:
+            return []
+
+        sql = (
+            "SELECT p.title, p.authors, p.venue, p.year, p.citations, p.url, "
+            "snippet(papers_fts, 3, '**', '**', ' … ', 24) "
+            "FROM papers_fts JOIN papers p ON p.id = papers_fts.rowid "
+            "WHERE papers_fts MATCH ?"
+        )
+        params = [" AND ".join(clauses)]
+        if year_from is not None:
+            sql += " AND p.year >= ?"
+            params.append(int(year_from))
+        if year_to is not None:
+            sql += " AND p.year <= ?"
+            params.append(int(year_to))
+        sql += f" ORDER BY bm25(papers_fts, {', '.join(map(str, RANK_WEIGHTS))}) LIMIT ?"
+        params.append(int(limit))
+
+        return [
+            {"Title": t, "Authors": a, "Venue": v, "Year": y, "Citation Count": c, "Scholar URL": u, "Snippet": s}
+            for t, a, v, y, c, u, s in self.conn.execute(sql, params)
+        ]
+
+
+def index_rows(rows, path=SEARCH_INDEX_DB):
+    """Index rows if search indexing is enabled (SEARCH_INDEX_DB not empty)"""
+    if not path:
+        return None
+    try:
+        index = SearchIndex(path)
+        try:
+            return index.upsert_rows(rows)
+        finally:
+            index.close()
+    except Exception as err:
+        print(f"Could not update search index: {err}")
+        return None
@@ -1,19 +1,39 @@
 """
 Simple HTTP Proxy Server to deploy on Azure
 This can be deployed as a separate Azure App Service or Azure Container Instance
+
+Runs as an ASGI app so one worker can hold many requests in flight while
+they wait on the pacing delay or on Google Scholar:
+    gunicorn -k uvicorn.workers.UvicornWorker -w 2 simple_proxy_server:app
 """
 
-from flask import Flask, request, Response
-import requests
+from bisect import bisect_left
+from collections import OrderedDict, defaultdict
+from contextlib import asynccontextmanager
+from http import HTTPStatus
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import Response, JSONResponse, HTMLResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+import httpx
+import asyncio
+import base64
+import binascii
+import gzip
+import ipaddress
+import json
+import math
 import random
+import socket
+import threading
 import time
+import zlib
 from datetime import datetime
 import logging
 import certifi
 import os
 
-app = Flask(__name__)
-
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -27,105 +47,1223 @@ USER_AGENTS = [
     'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.1 Safari/605.1.15',
 ]
 
-# Rate limiting
-request_times = []
-MAX_REQUESTS_PER_MINUTE = 10
+# Rate limiting: one token bucket per target host and one per client
+MAX_REQUESTS_PER_MINUTE = int(os.getenv('PROXY_MAX_REQUESTS_PER_MINUTE', '10'))
+CLIENT_MAX_REQUESTS_PER_MINUTE = int(os.getenv('PROXY_CLIENT_MAX_REQUESTS_PER_MINUTE', str(MAX_REQUESTS_PER_MINUTE)))
+RATE_LIMIT_BURST = int(os.getenv('PROXY_RATE_LIMIT_BURST', '3'))
+# Requests wait for a slot instead of getting a 429, up to this deadline and queue length
+RATE_LIMIT_MAX_WAIT = float(os.getenv('PROXY_RATE_LIMIT_MAX_WAIT', '20'))
+RATE_LIMIT_MAX_QUEUE = int(os.getenv('PROXY_RATE_LIMIT_MAX_QUEUE', '20'))
 PROXY_VERIFY_SSL = os.getenv('PROXY_VERIFY_SSL', 'false').lower() == 'true'
 
-def check_rate_limit():
-    """Simple rate limiting"""
-    global request_times
-    now = datetime.now()
-    
-    # Remove requests older than 1 minute
-    request_times = [t for t in request_times if (now - t).total_seconds() < 60]
-    
-    if len(request_times) >= MAX_REQUESTS_PER_MINUTE:
+# Shared upstream connection pool
+UPSTREAM_POOL_SIZE = int(os.getenv('PROXY_UPSTREAM_POOL_SIZE', '20'))
+UPSTREAM_TIMEOUT = float(os.getenv('PROXY_UPSTREAM_TIMEOUT', '30'))
+
+# Connection-scoped headers that must not be forwarded (RFC 9110 section 7.6.1)
+HOP_BY_HOP_HEADERS = {
+    'connection', 'keep-alive', 'proxy-authenticate', 'proxy-authorization',
+    'proxy-connection', 'te', 'trailer', 'trailers', 'transfer-encoding', 'upgrade',
+}
+# Set by the serving side (uvicorn adds its own), so upstream copies would be duplicated
+SERVER_SET_HEADERS = {'date', 'server'}
+
+# Response cache for repeated Scholar URLs
+CACHE_TTL_SECONDS = int(os.getenv('PROXY_CACHE_TTL', '900'))
+CACHE_MAX_ENTRIES = int(os.getenv('PROXY_CACHE_MAX_ENTRIES', '256'))
+CACHE_MAX_ENTRY_BYTES = int(os.getenv('PROXY_CACHE_MAX_ENTRY_BYTES', str(2 * 1024 * 1024)))
+
+# Batch endpoint: URLs fetched concurrently per batch, and how long one URL may wait for a slot
+BATCH_MAX_URLS = int(os.getenv('PROXY_BATCH_MAX_URLS', '500'))
+BATCH_CONCURRENCY = int(os.getenv('PROXY_BATCH_CONCURRENCY', '4'))
+BATCH_URL_DEADLINE = float(os.getenv('PROXY_BATCH_URL_DEADLINE', '900'))
+BATCH_ACCEPT_ENCODING = 'gzip,deflate'
+# Content codings decode_body can read; upstream requests are limited to these
+DECODABLE_ENCODINGS = {'gzip', 'deflate', 'identity'}
+
+# Forward-proxy mode: a standard HTTP proxy (with HTTPS CONNECT tunnelling) on its own port,
+# usable from requests/httpx proxies, scholarly's SingleProxy or Playwright. 0 disables it.
+FORWARD_PROXY_PORT = int(os.getenv('FORWARD_PROXY_PORT', '0'))
+# Loopback by default; any other address also needs FORWARD_PROXY_AUTH, or the server refuses to start
+FORWARD_PROXY_HOST = os.getenv('FORWARD_PROXY_HOST', '127.0.0.1')
+# "user:password" required in Proxy-Authorization
+FORWARD_PROXY_AUTH = os.getenv('FORWARD_PROXY_AUTH', '')
+FORWARD_PROXY_CONNECT_PORTS = {
+    int(p) for p in os.getenv('FORWARD_PROXY_CONNECT_PORTS', '443').split(',') if p.strip()
+}
+# Private, loopback and link-local targets (e.g. the 169.254.169.254 metadata service) are refused unless enabled
+FORWARD_PROXY_ALLOW_PRIVATE = os.getenv('FORWARD_PROXY_ALLOW_PRIVATE', 'false').lower() == 'true'
+# A tunnel takes one rate-limit slot however many requests it carries, so cap how many are open per worker
+FORWARD_PROXY_MAX_TUNNELS = int(os.getenv('FORWARD_PROXY_MAX_TUNNELS', '8'))
+FORWARD_PROXY_IDLE_TIMEOUT = float(os.getenv('FORWARD_PROXY_IDLE_TIMEOUT', '60'))
+FORWARD_MAX_HEADER_BYTES = 64 * 1024
+
+# Scholar requests are sent here instead when set (e.g. mock_scholar_server.py at
+# http://127.0.0.1:9100); rate limits, cache keys and metrics still use the Scholar URL
+SCHOLAR_ORIGIN = 'https://scholar.google.com'
+SCHOLAR_BASE_URL = os.getenv('SCHOLAR_BASE_URL', SCHOLAR_ORIGIN).rstrip('/')
+
+# Same markers the app uses to spot Scholar challenge pages
+BLOCK_MARKERS = ['sorry', 'unusual traffic', 'captcha', '/sorry/']
+
+# Histogram bucket bounds (seconds)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+WAIT_BUCKETS = (0.0, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0)
+TRACKED_PATHS = {'/proxy', '/batch', '/health', '/metrics', '/'}
+
+upstream_client = None
+# When this node last got a block page; reported on /health so fleet clients can rotate away
+last_block_at = None
+# CONNECT tunnels currently open in this worker
+open_tunnels = 0
+
+
+def build_upstream_client():
+    """One keep-alive client per worker, so repeat hosts skip the TCP/TLS handshake"""
+    return httpx.AsyncClient(
+        verify=certifi.where() if PROXY_VERIFY_SSL else False,
+        timeout=UPSTREAM_TIMEOUT,
+        follow_redirects=True,
+        limits=httpx.Limits(
+            max_connections=UPSTREAM_POOL_SIZE,
+            max_keepalive_connections=UPSTREAM_POOL_SIZE,
+        ),
+    )
+
+
+@asynccontextmanager
+async def lifespan(app):
+    global upstream_client
+    if FORWARD_PROXY_PORT and not FORWARD_PROXY_AUTH and not is_loopback_host(FORWARD_PROXY_HOST):
+        raise RuntimeError(
+            f'Refusing to run an open forward proxy on {FORWARD_PROXY_HOST}; set FORWARD_PROXY_AUTH '
+            'or bind FORWARD_PROXY_HOST to 127.0.0.1'
+        )
+    upstream_client = build_upstream_client()
+    forward_server = None
+    if FORWARD_PROXY_PORT:
+        # reuse_port lets every worker process accept on the same forward-proxy port
+        forward_server = await asyncio.start_server(
+            handle_forward_client, host=FORWARD_PROXY_HOST, port=FORWARD_PROXY_PORT,
+            reuse_port=True, limit=FORWARD_MAX_HEADER_BYTES,
+        )
+        logger.info(f"Forward proxy listening on {FORWARD_PROXY_HOST}:{FORWARD_PROXY_PORT}")
+    try:
+        yield
+    finally:
+        if forward_server is not None:
+            forward_server.close()
+            await forward_server.wait_closed()
+        await upstream_client.aclose()
+        upstream_client = None
+
+
+def filter_response_headers(headers):
+    """
+    Drop hop-by-hop headers, including any named in the upstream Connection header,
+    and the Date/Server headers the serving side adds itself. Content-Encoding and Content-Length are kept because the body is passed
+    through exactly as the upstream sent it.
+    """
+    drop = HOP_BY_HOP_HEADERS | SERVER_SET_HEADERS
+    for value in headers.get_list('connection'):
+        drop.update(token.strip().lower() for token in value.split(','))
+    return [(k, v) for k, v in headers.multi_items() if k.lower() not in drop]
+
+
+def normalize_target_url(url):
+    """Cache key form of a URL: lowercase scheme/host, no default port or fragment, sorted query"""
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or '').lower()
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f'{host}:{parts.port}'
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, host, parts.path or '/', query, ''))
+
+
+def scholar_upstream_url(url):
+    """Rewrite a scholar.google.com URL onto SCHOLAR_BASE_URL"""
+    if SCHOLAR_BASE_URL == SCHOLAR_ORIGIN:
+        return url
+    parts = urlsplit(url)
+    if (parts.hostname or '').lower() != 'scholar.google.com':
+        return url
+    base = urlsplit(SCHOLAR_BASE_URL)
+    return urlunsplit((base.scheme, base.netloc, parts.path, parts.query, ''))
+
+
+def decode_body(body, content_encoding):
+    """Best-effort decode of a raw upstream body, None if the encoding is not supported"""
+    encoding = (content_encoding or '').strip().lower()
+    try:
+        if encoding in ('', 'identity'):
+            return body
+        if encoding == 'gzip':
+            return gzip.decompress(body)
+        if encoding == 'deflate':
+            try:
+                return zlib.decompress(body)
+            except zlib.error:
+                return zlib.decompress(body, -zlib.MAX_WBITS)
+    except (OSError, EOFError, zlib.error):
+        return None
+    return None
+
+
+def upstream_accept_encoding(accept_encoding):
+    """The caller's Accept-Encoding narrowed to codings decode_body supports"""
+    codings = [
+        coding.strip() for coding in accept_encoding.split(',')
+        if coding.split(';')[0].strip().lower() in DECODABLE_ENCODINGS
+    ]
+    return ', '.join(codings) or 'identity'
+
+
+def is_block_page(status_code, body, content_encoding):
+    if status_code in (403, 429, 503):
+        return True
+    decoded = decode_body(body, content_encoding)
+    if decoded is None:
+        # Unreadable body (corrupt or unexpected coding): judge by status alone
         return False
-    
-    request_times.append(now)
+    text = decoded.decode('utf-8', errors='ignore').lower()
+    return any(marker in text for marker in BLOCK_MARKERS)
+
+
+class CachedResponse:
+    """A fully read upstream response, body kept exactly as received"""
+
+    def __init__(self, status_code, headers, body):
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+        self.stored_at = time.monotonic()
+
+    def to_response(self, cache_status):
+        response = Response(self.body, status_code=self.status_code)
+        response.raw_headers = [
+            (k.encode('latin-1'), v.encode('latin-1'))
+            for k, v in self.headers if k.lower() != 'content-length'
+        ] + [
+            (b'content-length', str(len(self.body)).encode('latin-1')),
+            (b'x-proxy-cache', cache_status.encode('latin-1')),
+        ]
+        return response
+
+
+class ResponseCache:
+    """
+    Bounded LRU cache of successful, non-block responses with a TTL.
+    Also tracks in-flight fetches so identical concurrent requests wait for
+    the first one instead of going upstream again.
+    """
+
+    def __init__(self, ttl, max_entries):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.inflight = {}
+        self.stats = {'hits': 0, 'misses': 0, 'coalesced': 0, 'stored': 0, 'evicted': 0}
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry.stored_at > self.ttl:
+            del self.entries[key]
+            return None
+        self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        self.stats['stored'] += 1
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+            self.stats['evicted'] += 1
+
+    def begin_fetch(self, key):
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may be waiting when a failed fetch is recorded; mark it retrieved
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self.inflight[key] = future
+        return future
+
+    def end_fetch(self, key, future, error=None):
+        """Release the in-flight slot; waiters get error (or a RuntimeError) if no result was set"""
+        if not future.done():
+            if not isinstance(error, Exception):
+                # Cancellation must not propagate into coalesced waiters
+                error = RuntimeError('Upstream fetch did not complete')
+            future.set_exception(error)
+        if self.inflight.get(key) is future:
+            del self.inflight[key]
+
+    def summary(self):
+        lookups = self.stats['hits'] + self.stats['misses'] + self.stats['coalesced']
+        return {
+            'entries': len(self.entries),
+            'max_entries': self.max_entries,
+            'ttl_seconds': self.ttl,
+            'in_flight': len(self.inflight),
+            'hit_ratio': round((self.stats['hits'] + self.stats['coalesced']) / lookups, 3) if lookups else 0.0,
+            **self.stats,
+        }
+
+
+response_cache = ResponseCache(CACHE_TTL_SECONDS, CACHE_MAX_ENTRIES)
+
+
+class TokenBucket:
+    """
+    Token bucket that hands out reservations. Tokens may go negative: each
+    waiting request holds a future token, so slots are granted in arrival order.
+    """
+
+    def __init__(self, rate_per_minute, burst):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = float(burst)
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_for_token(self):
+        """Seconds until the next reservation would be usable"""
+        if self.tokens >= 1:
+            return 0.0
+        return (1 - self.tokens) / self.rate
+
+    def is_idle(self, now):
+        self.refill(now)
+        return self.tokens >= self.capacity
+
+
+class RateLimiter:
+    """
+    Lock-protected token buckets keyed by target host and by client.
+    acquire() waits (without blocking the worker) until both buckets allow
+    the request, or refuses straight away if the wait would pass the
+    deadline or the wait queue is full.
+    """
+
+    MAX_BUCKETS = 1024
+
+    def __init__(self, host_rate, client_rate, burst, max_wait, max_queue):
+        self.host_rate = host_rate
+        self.client_rate = client_rate
+        self.burst = burst
+        self.max_wait = max_wait
+        self.max_queue = max_queue
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.waiting = 0
+        self.rejected = 0
+
+    def bucket(self, kind, key, rate):
+        bucket = self.buckets.get((kind, key))
+        if bucket is None:
+            if len(self.buckets) >= self.MAX_BUCKETS:
+                self.prune(time.monotonic())
+            bucket = TokenBucket(rate, self.burst)
+            self.buckets[(kind, key)] = bucket
+        return bucket
+
+    def prune(self, now):
+        """Forget buckets that are full again; they would be recreated identical"""
+        for key in [k for k, b in self.buckets.items() if b.is_idle(now)]:
+            del self.buckets[key]
+
+    def reserve(self, host, client):
+        """Take a slot in both buckets. Returns the seconds to wait, or None if refused."""
+        with self.lock:
+            now = time.monotonic()
+            buckets = [
+                self.bucket('host', host, self.host_rate),
+                self.bucket('client', client, self.client_rate),
+            ]
+            for bucket in buckets:
+                bucket.refill(now)
+
+            wait = max(bucket.wait_for_token() for bucket in buckets)
+            if wait > self.max_wait or (wait > 0 and self.waiting >= self.max_queue):
+                self.rejected += 1
+                return None
+
+            for bucket in buckets:
+                bucket.tokens -= 1
+            if wait > 0:
+                self.waiting += 1
+            return wait
+
+    def retry_after(self, host, client):
+        """Rough seconds until a refused request would fit within the deadline"""
+        with self.lock:
+            waits = [
+                b.wait_for_token()
+                for b in (self.buckets.get(('host', host)), self.buckets.get(('client', client)))
+                if b is not None
+            ]
+        return max(1, math.ceil(max(waits, default=0) - self.max_wait))
+
+    async def acquire(self, host, client):
+        wait = self.reserve(host, client)
+        if wait is None:
+            return None
+        if wait > 0:
+            try:
+                await asyncio.sleep(wait)
+            finally:
+                with self.lock:
+                    self.waiting -= 1
+        return wait
+
+    def summary(self):
+        with self.lock:
+            return {
+                'requests_per_minute_per_host': self.host_rate,
+                'requests_per_minute_per_client': self.client_rate,
+                'burst': self.burst,
+                'waiting': self.waiting,
+                'rejected': self.rejected,
+            }
+
+
+rate_limiter = RateLimiter(
+    MAX_REQUESTS_PER_MINUTE,
+    CLIENT_MAX_REQUESTS_PER_MINUTE,
+    RATE_LIMIT_BURST,
+    RATE_LIMIT_MAX_WAIT,
+    RATE_LIMIT_MAX_QUEUE,
+)
+
+
+class Histogram:
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class ProxyMetrics:
+    """
+    In-process counters, gauges and histograms rendered in the Prometheus
+    text format. Recording is a dict lookup and an integer add on the event
+    loop thread, so no lock is taken on the request path.
+    """
+
+    HELP = {
+        'proxy_requests_total': ('counter', 'Requests served, by path and status'),
+        'proxy_in_flight_requests': ('gauge', 'Requests currently being served, by path'),
+        'proxy_response_bytes_total': ('counter', 'Body bytes sent to clients, by path'),
+        'proxy_upstream_responses_total': ('counter', 'Upstream responses, by target host and status'),
+        'proxy_upstream_errors_total': ('counter', 'Upstream requests that failed without a response, by target host'),
+        'proxy_upstream_block_pages_total': ('counter', 'Upstream responses detected as block/CAPTCHA pages, by target host'),
+        'proxy_upstream_bytes_total': ('counter', 'Raw body bytes received from upstream, by target host'),
+        'proxy_upstream_in_flight': ('gauge', 'Upstream requests currently open, by target host'),
+        'proxy_upstream_latency_seconds': ('histogram', 'Time until upstream response headers, by target host'),
+        'proxy_rate_limit_wait_seconds': ('histogram', 'Time requests waited for a rate-limit slot'),
+        'proxy_rate_limit_rejections_total': ('counter', 'Requests refused by the rate limiter'),
+        'proxy_rate_limit_waiting': ('gauge', 'Requests currently waiting for a rate-limit slot'),
+        'proxy_cache_lookups_total': ('counter', 'Response cache lookups, by result'),
+        'proxy_cache_entries': ('gauge', 'Responses currently cached'),
+        'proxy_tunnels_total': ('counter', 'CONNECT tunnels requested, by target host and result'),
+        'proxy_tunnels_open': ('gauge', 'CONNECT tunnels currently open'),
+        'proxy_tunnel_bytes_total': ('counter', 'Bytes relayed through CONNECT tunnels, by target host and direction'),
+    }
+
+    def __init__(self):
+        self.counters = defaultdict(int)
+        self.gauges = defaultdict(int)
+        self.histograms = {}
+
+    def inc(self, name, value=1, **labels):
+        self.counters[(name, tuple(labels.items()))] += value
+
+    def gauge_add(self, name, value, **labels):
+        self.gauges[(name, tuple(labels.items()))] += value
+
+    def total(self, name):
+        """Sum of a counter or gauge across all label sets"""
+        return (sum(v for (n, _), v in self.counters.items() if n == name)
+                + sum(v for (n, _), v in self.gauges.items() if n == name))
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(labels.items()))
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram(buckets)
+        histogram.observe(value)
+
+    @staticmethod
+    def format_labels(labels, extra=()):
+        pairs = list(labels) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{k}="{v}"' for k, v in pairs) + '}'
+
+    def render(self):
+        # Pull counts other components already keep, rather than double-recording them
+        gauges = dict(self.gauges)
+        counters = dict(self.counters)
+        gauges[('proxy_rate_limit_waiting', ())] = rate_limiter.waiting
+        counters[('proxy_rate_limit_rejections_total', ())] = rate_limiter.rejected
+        gauges[('proxy_cache_entries', ())] = len(response_cache.entries)
+        for result in ('hits', 'misses', 'coalesced'):
+            counters[('proxy_cache_lookups_total', (('result', result),))] = response_cache.stats[result]
+
+        series = defaultdict(list)
+        for (name, labels), value in counters.items():
+            series[name].append(f'{name}{self.format_labels(labels)} {value}')
+        for (name, labels), value in gauges.items():
+            series[name].append(f'{name}{self.format_labels(labels)} {value}')
+        for (name, labels), histogram in self.histograms.items():
+            cumulative = 0
+            for bound, count in zip(list(histogram.buckets) + ['+Inf'], histogram.counts):
+                cumulative += count
+                series[name].append(f'{name}_bucket{self.format_labels(labels, [("le", bound)])} {cumulative}')
+            series[name].append(f'{name}_sum{self.format_labels(labels)} {histogram.sum:.6f}')
+            series[name].append(f'{name}_count{self.format_labels(labels)} {histogram.count}')
+
+        lines = []
+        for name in sorted(series):
+            metric_type, help_text = self.HELP.get(name, ('untyped', name))
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} {metric_type}')
+            lines.extend(series[name])
+        return '\n'.join(lines) + '\n'
+
+
+metrics = ProxyMetrics()
+
+
+class MetricsMiddleware:
+    """ASGI middleware counting requests, in-flight requests and bytes sent per path"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+
+        path = scope['path'] if scope['path'] in TRACKED_PATHS else 'other'
+        status = {'code': 500}
+
+        async def counting_send(message):
+            if message['type'] == 'http.response.start':
+                status['code'] = message['status']
+            elif message['type'] == 'http.response.body':
+                metrics.inc('proxy_response_bytes_total', len(message.get('body', b'')), path=path)
+            await send(message)
+
+        metrics.gauge_add('proxy_in_flight_requests', 1, path=path)
+        try:
+            await self.app(scope, receive, counting_send)
+        finally:
+            metrics.gauge_add('proxy_in_flight_requests', -1, path=path)
+            metrics.inc('proxy_requests_total', path=path, status=status['code'])
+
+
+def client_id(request):
+    """Caller address, preferring the first X-Forwarded-For hop set by the Azure front end"""
+    forwarded = request.headers.get('x-forwarded-for')
+    if forwarded:
+        return forwarded.split(',')[0].strip()
+    return request.client.host if request.client else 'unknown'
+
+
+def upstream_headers(accept_encoding):
+    """Browser-like headers with a rotated user agent"""
+    return {
+        'User-Agent': random.choice(USER_AGENTS),
+        'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
+        'Accept-Language': 'en-US,en;q=0.5',
+        'Accept-Encoding': accept_encoding,
+        'Connection': 'keep-alive',
+        'Upgrade-Insecure-Requests': '1',
+        'Cache-Control': 'max-age=0',
+    }
+
+
+async def lookup_cache(cache_key):
+    """Return (entry, 'HIT' or 'COALESCED') if the response is cached or being fetched, else (None, None)"""
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        response_cache.stats['hits'] += 1
+        return cached, 'HIT'
+
+    pending = response_cache.inflight.get(cache_key)
+    if pending is not None:
+        try:
+            shared = await asyncio.wait_for(asyncio.shield(pending), timeout=UPSTREAM_TIMEOUT + 5)
+            response_cache.stats['coalesced'] += 1
+            return shared, 'COALESCED'
+        except Exception:
+            # The shared fetch failed; the caller fetches on its own
+            pass
+    return None, None
+
+
+async def wait_for_slot(target_host, caller):
+    """Wait for a rate-limit slot for this target host and client; False if refused"""
+    waited = await rate_limiter.acquire(target_host, caller)
+    if waited is None:
+        return False
+    metrics.observe('proxy_rate_limit_wait_seconds', waited, buckets=WAIT_BUCKETS)
     return True
 
-@app.route('/proxy', methods=['GET', 'POST'])
-def proxy():
+
+async def open_upstream(method, target_url, target_host, accept_encoding, content=None,
+                        headers=None, follow_redirects=True):
+    """Send the paced upstream request over the shared pool and return the streaming response"""
+    # Random delay to avoid detection (does not hold the worker)
+    await asyncio.sleep(random.uniform(1, 3))
+
+    upstream_request = upstream_client.build_request(
+        method,
+        scholar_upstream_url(target_url),
+        headers=headers if headers is not None else upstream_headers(accept_encoding),
+        content=content,
+    )
+    metrics.gauge_add('proxy_upstream_in_flight', 1, host=target_host)
+    started = time.perf_counter()
+    try:
+        response = await upstream_client.send(upstream_request, stream=True, follow_redirects=follow_redirects)
+    except httpx.HTTPError as e:
+        metrics.gauge_add('proxy_upstream_in_flight', -1, host=target_host)
+        metrics.inc('proxy_upstream_errors_total', host=target_host)
+        logger.error(f"Proxy request failed: {e}")
+        raise
+    metrics.observe('proxy_upstream_latency_seconds', time.perf_counter() - started, host=target_host)
+    metrics.inc('proxy_upstream_responses_total', host=target_host, status=response.status_code)
+
+    # Log the request
+    logger.info(f"Proxied request to {target_url} - Status: {response.status_code}")
+    return response
+
+
+class UpstreamRelay:
+    """
+    Async iterable of the raw upstream chunks. When a cache future is given the
+    chunks are also kept so the finished body can be cached and handed to
+    coalesced waiters. aclose() releases the upstream connection and the
+    in-flight cache slot; it is idempotent and also works if iteration never
+    started (e.g. the client left before the response began).
+    """
+
+    def __init__(self, response, target_host, cache_key=None, future=None):
+        self.response = response
+        self.target_host = target_host
+        self.cache_key = cache_key
+        self.future = future
+        self.received = 0
+        self.error = None
+        self.closed = False
+
+    async def __aiter__(self):
+        global last_block_at
+        response, future = self.response, self.future
+        chunks = []
+        buffered = 0
+        try:
+            async for chunk in response.aiter_raw():
+                self.received += len(chunk)
+                if future is not None and buffered <= CACHE_MAX_ENTRY_BYTES:
+                    chunks.append(chunk)
+                    buffered += len(chunk)
+                yield chunk
+
+            complete = future is not None and buffered <= CACHE_MAX_ENTRY_BYTES
+            if complete:
+                body = b''.join(chunks)
+                blocked = is_block_page(response.status_code, body, response.headers.get('content-encoding'))
+            else:
+                # Body was not kept; judge by status alone
+                blocked = response.status_code in (403, 429, 503)
+            if blocked:
+                metrics.inc('proxy_upstream_block_pages_total', host=self.target_host)
+                last_block_at = time.time()
+
+            if complete:
+                entry = CachedResponse(response.status_code, filter_response_headers(response.headers), body)
+                future.set_result(entry)
+                if response.status_code == 200 and not blocked:
+                    response_cache.put(self.cache_key, entry)
+        except BaseException as e:
+            self.error = e
+            raise
+        finally:
+            await self.aclose()
+
+    async def aclose(self):
+        if self.closed:
+            return
+        self.closed = True
+        try:
+            await self.response.aclose()
+        finally:
+            metrics.gauge_add('proxy_upstream_in_flight', -1, host=self.target_host)
+            metrics.inc('proxy_upstream_bytes_total', self.received, host=self.target_host)
+            if self.future is not None:
+                response_cache.end_fetch(self.cache_key, self.future, self.error)
+
+
+class RelayResponse(StreamingResponse):
+    """StreamingResponse that always closes its body iterator, even when the client disconnects early"""
+
+    async def __call__(self, scope, receive, send):
+        try:
+            await super().__call__(scope, receive, send)
+        finally:
+            await self.body_iterator.aclose()
+
+
+async def proxy(request: Request):
     """
     Proxy endpoint that forwards requests to target URL
     Usage: http://your-proxy.azurewebsites.net/proxy?url=https://scholar.google.com/...
     """
-    
-    # Check rate limit
-    if not check_rate_limit():
-        return Response('Rate limit exceeded. Please try again later.', status=429)
-    
+
     # Get target URL from query parameter
-    target_url = request.args.get('url')
-    
+    target_url = request.query_params.get('url')
+
     if not target_url:
-        return Response('Missing URL parameter', status=400)
-    
+        return Response('Missing URL parameter', status_code=400)
+
     # Validate URL (basic security)
     if not target_url.startswith(('http://', 'https://')):
-        return Response('Invalid URL', status=400)
-    
+        return Response('Invalid URL', status_code=400)
+
+    # Compressed bodies are streamed through untouched, so honour what the caller accepts
+    # (limited to codings the block-page check can read)
+    accept_encoding = upstream_accept_encoding(request.headers.get('accept-encoding', 'gzip, deflate'))
+
+    cache_key = None
+    if request.method == 'GET':
+        # The cached body is stored encoded, so the encoding the caller accepts is part of the key
+        cache_key = (normalize_target_url(target_url), accept_encoding.replace(' ', '').lower())
+        entry, cache_status = await lookup_cache(cache_key)
+        if entry is not None:
+            return entry.to_response(cache_status)
+
+    # Wait for a slot for this target host and client (bounded queue and deadline)
+    target_host = (urlsplit(target_url).hostname or '').lower()
+    caller = client_id(request)
+    if not await wait_for_slot(target_host, caller):
+        return Response(
+            'Rate limit exceeded. Please try again later.',
+            status_code=429,
+            headers={'Retry-After': str(rate_limiter.retry_after(target_host, caller))},
+        )
+
+    future = None
+    if cache_key is not None:
+        response_cache.stats['misses'] += 1
+        future = response_cache.begin_fetch(cache_key)
+
+    response = None
+    error = None
     try:
-        # Random delay to avoid detection
-        time.sleep(random.uniform(1, 3))
-        
-        # Prepare headers with rotation
-        headers = {
-            'User-Agent': random.choice(USER_AGENTS),
-            'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/webp,*/*;q=0.8',
-            'Accept-Language': 'en-US,en;q=0.5',
-            'Accept-Encoding': 'gzip, deflate',
-            'Connection': 'keep-alive',
-            'Upgrade-Insecure-Requests': '1',
-            'Cache-Control': 'max-age=0',
-        }
-        
         # Forward the request
-        verify_ssl = certifi.where() if PROXY_VERIFY_SSL else False
-
-        if request.method == 'GET':
-            response = requests.get(
-                target_url,
-                headers=headers,
-                timeout=30,
-                verify=verify_ssl,
-                allow_redirects=True
+        response = await open_upstream(
+            request.method,
+            target_url,
+            target_host,
+            accept_encoding,
+            content=await request.body() if request.method == 'POST' else None,
+        )
+    except httpx.HTTPError as e:
+        error = e
+        return Response(f'Proxy request failed: {str(e)}', status_code=500)
+    finally:
+        # From here on the relay owns the in-flight slot; release it on failure or cancellation
+        if response is None and future is not None:
+            response_cache.end_fetch(cache_key, future, error)
+
+    # Stream the raw (still compressed) upstream bytes chunk by chunk
+    streamed = RelayResponse(
+        UpstreamRelay(response, target_host, cache_key, future),
+        status_code=response.status_code,
+    )
+    streamed.raw_headers = [
+        (k.encode('latin-1'), v.encode('latin-1'))
+        for k, v in filter_response_headers(response.headers)
+    ] + [(b'x-proxy-cache', b'MISS' if future is not None else b'BYPASS')]
+    return streamed
+
+
+async def fetch_for_batch(target_url, caller):
+    """
+    Fetch one batch URL through the same cache, coalescing, rate limiter,
+    pacing and connection pool as /proxy. Returns a JSON-ready record.
+    """
+    started = time.perf_counter()
+    record = {'url': target_url}
+
+    if not isinstance(target_url, str) or not target_url.startswith(('http://', 'https://')):
+        record.update(status=400, error='Invalid URL')
+        return record
+
+    cache_key = (normalize_target_url(target_url), BATCH_ACCEPT_ENCODING)
+    entry, cache_status = await lookup_cache(cache_key)
+
+    if entry is None:
+        # A batch is already server-side, so it waits its turn rather than failing on 429
+        target_host = (urlsplit(target_url).hostname or '').lower()
+        deadline = time.monotonic() + BATCH_URL_DEADLINE
+        while not await wait_for_slot(target_host, caller):
+            if time.monotonic() >= deadline:
+                record.update(status=429, error='Rate limit exceeded', elapsed_s=round(time.perf_counter() - started, 3))
+                return record
+            await asyncio.sleep(rate_limiter.retry_after(target_host, caller))
+
+        response_cache.stats['misses'] += 1
+        future = response_cache.begin_fetch(cache_key)
+        response = None
+        error = None
+        try:
+            response = await open_upstream('GET', target_url, target_host, BATCH_ACCEPT_ENCODING)
+        except httpx.HTTPError as e:
+            error = e
+            record.update(status=502, error=f'Proxy request failed: {e}', elapsed_s=round(time.perf_counter() - started, 3))
+            return record
+        finally:
+            if response is None:
+                response_cache.end_fetch(cache_key, future, error)
+
+        relay = UpstreamRelay(response, target_host, cache_key, future)
+        try:
+            async for _ in relay:
+                pass
+        except httpx.HTTPError as e:
+            # Reset or truncated body: report it on this URL's record and let the batch go on
+            record.update(status=502, error=f'Upstream body incomplete: {e}', elapsed_s=round(time.perf_counter() - started, 3))
+            return record
+        finally:
+            await relay.aclose()
+        if future.cancelled() or future.exception() is not None:
+            record.update(status=502, error='Response too large to relay in a batch')
+            return record
+        entry, cache_status = future.result(), 'MISS'
+
+    encoding = dict((k.lower(), v) for k, v in entry.headers).get('content-encoding')
+    decoded = decode_body(entry.body, encoding)
+    record.update(
+        status=entry.status_code,
+        cache=cache_status,
+        blocked=is_block_page(entry.status_code, entry.body, encoding),
+        body=decoded.decode('utf-8', errors='replace') if decoded is not None else '',
+        # Raw (still encoded) body size, for clients that account bytes on the wire
+        bytes=len(entry.body),
+        elapsed_s=round(time.perf_counter() - started, 3),
+    )
+    return record
+
+
+async def batch(request: Request):
+    """
+    Batch endpoint: POST {"urls": [...]} and read newline-delimited JSON
+    records back, one per URL, in completion order. Each record carries the
+    URL's position in the request as "index"; fetched pages also carry their
+    raw body size as "bytes".
+    """
+    try:
+        payload = await request.json()
+    except ValueError:
+        return Response('Body must be JSON: {"urls": [...]}', status_code=400)
+
+    urls = payload.get('urls') if isinstance(payload, dict) else None
+    if not isinstance(urls, list) or not urls:
+        return Response('Body must be JSON: {"urls": [...]}', status_code=400)
+    if len(urls) > BATCH_MAX_URLS:
+        return Response(f'At most {BATCH_MAX_URLS} URLs per batch', status_code=413)
+
+    caller = client_id(request)
+    slots = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(index, target_url):
+        async with slots:
+            try:
+                record = await fetch_for_batch(target_url, caller)
+            except Exception as e:
+                # One bad URL must not end the stream for the others
+                logger.exception(f"Batch fetch failed for {target_url}")
+                record = {'url': target_url, 'status': 502, 'error': f'Proxy request failed: {e}'}
+        record['index'] = index
+        return record
+
+    async def stream_records():
+        tasks = [asyncio.create_task(run(i, url)) for i, url in enumerate(urls)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                record = await finished
+                yield (json.dumps(record) + '\n').encode('utf-8')
+        finally:
+            # Client went away: stop fetching the rest and wait for their upstream slots to be released
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    return RelayResponse(stream_records(), media_type='application/x-ndjson')
+
+
+def is_loopback_host(host):
+    if host == 'localhost':
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def is_public_address(address):
+    ip = ipaddress.ip_address(address)
+    if getattr(ip, 'ipv4_mapped', None):
+        ip = ip.ipv4_mapped
+    return ip.is_global and not ip.is_multicast
+
+
+async def resolve_destination(host, port):
+    """
+    Address to connect to for a forward-proxy target, or None if it does not
+    resolve or (unless FORWARD_PROXY_ALLOW_PRIVATE) any address is not public
+    """
+    try:
+        infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except (OSError, UnicodeError):
+        return None
+    addresses = [info[4][0] for info in infos]
+    if not addresses:
+        return None
+    if not FORWARD_PROXY_ALLOW_PRIVATE and not all(is_public_address(a) for a in addresses):
+        return None
+    return addresses[0]
+
+
+def forward_auth_ok(headers):
+    if not FORWARD_PROXY_AUTH:
+        return True
+    value = headers.get('proxy-authorization', '')
+    scheme, _, encoded = value.partition(' ')
+    if scheme.lower() != 'basic':
+        return False
+    try:
+        return base64.b64decode(encoded).decode('utf-8') == FORWARD_PROXY_AUTH
+    except (binascii.Error, UnicodeDecodeError):
+        return False
+
+
+async def read_request_head(reader):
+    """Read one request line plus headers; None when the client closed or went idle"""
+    try:
+        head = await asyncio.wait_for(reader.readuntil(b'\r\n\r\n'), FORWARD_PROXY_IDLE_TIMEOUT)
+    except (asyncio.IncompleteReadError, asyncio.TimeoutError, ConnectionError):
+        return None
+    lines = head.decode('latin-1').split('\r\n')
+    method, target, version = lines[0].split(' ', 2)
+    headers = []
+    for line in lines[1:]:
+        if ':' in line:
+            name, value = line.split(':', 1)
+            headers.append((name.strip(), value.strip()))
+    return method.upper(), target, version.upper(), headers
+
+
+async def read_request_body(reader, headers):
+    """Read a Content-Length or chunked request body"""
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        body = bytearray()
+        while True:
+            size = int((await reader.readline()).split(b';')[0].strip() or b'0', 16)
+            if size == 0:
+                # Skip trailers up to the blank line
+                while (await reader.readline()) not in (b'\r\n', b'\n', b''):
+                    pass
+                return bytes(body)
+            body += await reader.readexactly(size)
+            await reader.readline()
+    length = int(headers.get('content-length', '0') or 0)
+    return await reader.readexactly(length) if length else None
+
+
+async def write_simple_response(writer, status, reason, text='', extra_headers=()):
+    body = text.encode('utf-8')
+    lines = [f'HTTP/1.1 {status} {reason}', f'Content-Length: {len(body)}', 'Content-Type: text/plain']
+    lines += [f'{k}: {v}' for k, v in extra_headers]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1') + body)
+    await writer.drain()
+    metrics.inc('proxy_requests_total', path='forward', status=status)
+
+
+async def pipe(reader, writer, target_host, direction):
+    try:
+        while True:
+            data = await reader.read(65536)
+            if not data:
+                break
+            writer.write(data)
+            await writer.drain()
+            metrics.inc('proxy_tunnel_bytes_total', len(data), host=target_host, direction=direction)
+    except ConnectionError:
+        pass
+    finally:
+        if not writer.is_closing():
+            writer.close()
+
+
+async def tunnel(client_reader, client_writer, target, caller):
+    """
+    HTTPS CONNECT: rate-limit the tunnel by target host, then relay bytes both ways.
+    The proxy cannot see inside the tunnel, so the whole tunnel takes one
+    rate-limit slot and bypasses the cache; FORWARD_PROXY_MAX_TUNNELS bounds
+    how many are open at once.
+    """
+    global open_tunnels
+    host, _, port = target.rpartition(':')
+    host = host.strip('[]').lower()
+    if not host or not port.isdigit() or int(port) not in FORWARD_PROXY_CONNECT_PORTS:
+        await write_simple_response(client_writer, 403, 'Forbidden', 'CONNECT target not allowed')
+        return
+
+    if open_tunnels >= FORWARD_PROXY_MAX_TUNNELS:
+        metrics.inc('proxy_tunnels_total', host=host, result='over_limit')
+        await write_simple_response(
+            client_writer, 503, 'Service Unavailable', 'Too many open tunnels. Please try again later.',
+            [('Retry-After', 5)],
+        )
+        return
+
+    open_tunnels += 1
+    try:
+        address = await resolve_destination(host, int(port))
+        if address is None:
+            metrics.inc('proxy_tunnels_total', host=host, result='forbidden')
+            await write_simple_response(client_writer, 403, 'Forbidden', 'CONNECT target not allowed')
+            return
+
+        if not await wait_for_slot(host, caller):
+            metrics.inc('proxy_tunnels_total', host=host, result='rate_limited')
+            await write_simple_response(
+                client_writer, 429, 'Too Many Requests', 'Rate limit exceeded. Please try again later.',
+                [('Retry-After', rate_limiter.retry_after(host, caller))],
             )
-        else:
-            response = requests.post(
-                target_url,
-                headers=headers,
-                data=request.get_data(),
-                timeout=30,
-                verify=verify_ssl,
-                allow_redirects=True
+            return
+
+        try:
+            # Connect to the address that was checked, not a fresh lookup of the name
+            upstream_reader, upstream_writer = await asyncio.wait_for(
+                asyncio.open_connection(address, int(port)), UPSTREAM_TIMEOUT
             )
-        
-        # Log the request
-        logger.info(f"Proxied request to {target_url} - Status: {response.status_code}")
-        
-        # Return the response
-        return Response(
-            response.content,
-            status=response.status_code,
-            headers=dict(response.headers)
+        except (OSError, asyncio.TimeoutError) as e:
+            metrics.inc('proxy_tunnels_total', host=host, result='error')
+            await write_simple_response(client_writer, 502, 'Bad Gateway', f'Tunnel failed: {e}')
+            return
+
+        metrics.inc('proxy_tunnels_total', host=host, result='open')
+        metrics.inc('proxy_requests_total', path='forward', status=200)
+        client_writer.write(b'HTTP/1.1 200 Connection Established\r\n\r\n')
+        await client_writer.drain()
+
+        metrics.gauge_add('proxy_tunnels_open', 1)
+        try:
+            await asyncio.gather(
+                pipe(client_reader, upstream_writer, host, 'out'),
+                pipe(upstream_reader, client_writer, host, 'in'),
+            )
+        finally:
+            metrics.gauge_add('proxy_tunnels_open', -1)
+    finally:
+        open_tunnels -= 1
+
+
+async def write_forward_response(writer, method, status, reason, headers, chunks, keep_alive, version='HTTP/1.1'):
+    """
+    Send an upstream response to a forward-proxy client, framing the raw body ourselves.
+    HTTP/1.0 clients cannot read chunked framing, so a body without a length is
+    delimited by closing the connection instead. Returns whether the connection
+    can be kept open.
+    """
+    content_length = None
+    lines = [f'HTTP/1.1 {status} {reason}']
+    for k, v in headers:
+        if k.lower() == 'content-length':
+            content_length = v
+        else:
+            lines.append(f'{k}: {v}')
+    no_body = method == 'HEAD' or status in (204, 304) or 100 <= status < 200
+    unframed = content_length is None and not no_body
+    chunked = unframed and version != 'HTTP/1.0'
+    if unframed and not chunked:
+        keep_alive = False
+    if content_length is not None:
+        lines.append(f'Content-Length: {content_length}')
+    elif chunked:
+        lines.append('Transfer-Encoding: chunked')
+    lines.append('Connection: keep-alive' if keep_alive else 'Connection: close')
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+
+    sent = 0
+    try:
+        async for chunk in chunks:
+            if no_body or not chunk:
+                continue
+            writer.write(b'%x\r\n%s\r\n' % (len(chunk), chunk) if chunked else chunk)
+            sent += len(chunk)
+            await writer.drain()
+    finally:
+        # Release the upstream connection even if the client went away mid-body
+        await chunks.aclose()
+    if chunked:
+        writer.write(b'0\r\n\r\n')
+    await writer.drain()
+    metrics.inc('proxy_requests_total', path='forward', status=status)
+    metrics.inc('proxy_response_bytes_total', sent, path='forward')
+    return keep_alive
+
+
+async def forward_http(reader, writer, method, target, version, headers, caller):
+    """Plain-HTTP forward proxying of one absolute-form request. Returns whether to keep the connection."""
+    header_map = {k.lower(): v for k, v in headers}
+    connection = header_map.get('connection', header_map.get('proxy-connection', '')).lower()
+    keep_alive = 'close' not in connection and (version == 'HTTP/1.1' or 'keep-alive' in connection)
+
+    if not target.startswith('http://'):
+        await write_simple_response(writer, 400, 'Bad Request', 'Expected an absolute http:// URL or CONNECT')
+        return False
+
+    body = await read_request_body(reader, header_map)
+    target_host = (urlsplit(target).hostname or '').lower()
+    # Scholar targets rewritten onto SCHOLAR_BASE_URL go where the operator configured
+    if scholar_upstream_url(target) == target:
+        if await resolve_destination(target_host, urlsplit(target).port or 80) is None:
+            await write_simple_response(writer, 403, 'Forbidden', 'Target not allowed')
+            return keep_alive
+    drop = set(HOP_BY_HOP_HEADERS) | {'host', 'content-length', 'accept-encoding'}
+    drop.update(token.strip().lower() for token in connection.split(','))
+    accept_encoding = upstream_accept_encoding(header_map.get('accept-encoding', 'identity'))
+    forward_headers = [(k, v) for k, v in headers if k.lower() not in drop]
+    forward_headers.append(('Accept-Encoding', accept_encoding))
+
+    cache_key = None
+    if method == 'GET':
+        cache_key = (normalize_target_url(target), accept_encoding.replace(' ', '').lower())
+        entry, _ = await lookup_cache(cache_key)
+        if entry is not None:
+            async def cached_body():
+                yield entry.body
+            headers_out = [(k, v) for k, v in entry.headers if k.lower() != 'content-length']
+            headers_out.append(('Content-Length', str(len(entry.body))))
+            return await write_forward_response(writer, method, entry.status_code, HTTPStatus(entry.status_code).phrase,
+                                                headers_out, cached_body(), keep_alive, version)
+
+    if not await wait_for_slot(target_host, caller):
+        await write_simple_response(
+            writer, 429, 'Too Many Requests', 'Rate limit exceeded. Please try again later.',
+            [('Retry-After', rate_limiter.retry_after(target_host, caller))],
         )
-        
-    except requests.RequestException as e:
-        logger.error(f"Proxy request failed: {e}")
-        return Response(f'Proxy request failed: {str(e)}', status=500)
+        return keep_alive
 
-@app.route('/health', methods=['GET'])
-def health():
+    future = None
+    if cache_key is not None:
+        response_cache.stats['misses'] += 1
+        future = response_cache.begin_fetch(cache_key)
+    response = None
+    error = None
+    try:
+        response = await open_upstream(
+            method, target, target_host, accept_encoding,
+            content=body, headers=forward_headers, follow_redirects=False,
+        )
+    except httpx.HTTPError as e:
+        error = e
+    finally:
+        if response is None and future is not None:
+            response_cache.end_fetch(cache_key, future, error)
+    if response is None:
+        await write_simple_response(writer, 502, 'Bad Gateway', f'Proxy request failed: {error}')
+        return keep_alive
+
+    return await write_forward_response(
+        writer, method, response.status_code, response.reason_phrase,
+        filter_response_headers(response.headers),
+        UpstreamRelay(response, target_host, cache_key, future), keep_alive, version,
+    )
+
+
+async def handle_forward_client(reader, writer):
+    """One forward-proxy client connection; serves requests until it closes (persistent connections)"""
+    peer = writer.get_extra_info('peername')
+    caller = peer[0] if peer else 'unknown'
+    metrics.gauge_add('proxy_in_flight_requests', 1, path='forward')
+    try:
+        while True:
+            try:
+                request_head = await read_request_head(reader)
+            except (ValueError, asyncio.LimitOverrunError):
+                await write_simple_response(writer, 400, 'Bad Request', 'Malformed request')
+                break
+            if request_head is None:
+                break
+            method, target, version, headers = request_head
+
+            if not forward_auth_ok({k.lower(): v for k, v in headers}):
+                await write_simple_response(
+                    writer, 407, 'Proxy Authentication Required', 'Proxy authentication required',
+                    [('Proxy-Authenticate', 'Basic realm="simple-proxy"'), ('Connection', 'close')],
+                )
+                break
+
+            if method == 'CONNECT':
+                # The connection belongs to the tunnel from here on
+                await tunnel(reader, writer, target, caller)
+                break
+
+            if not await forward_http(reader, writer, method, target, version, headers, caller):
+                break
+    except (ConnectionError, asyncio.IncompleteReadError):
+        pass
+    finally:
+        metrics.gauge_add('proxy_in_flight_requests', -1, path='forward')
+        if not writer.is_closing():
+            writer.close()
+
+
+async def health(request: Request):
     """Health check endpoint for Azure"""
-    return {'status': 'healthy', 'timestamp': datetime.now().isoformat()}
+    return JSONResponse({
+        'status': 'healthy',
+        'timestamp': datetime.now().isoformat(),
+        'cache': response_cache.summary(),
+        'rate_limit': rate_limiter.summary(),
+        # Read by proxy_fleet to pick the least-loaded node and skip blocked ones
+        'load': {
+            'upstream_in_flight': metrics.total('proxy_upstream_in_flight'),
+            'waiting': rate_limiter.waiting,
+            'block_pages': metrics.total('proxy_upstream_block_pages_total'),
+            'last_block_age_seconds': round(time.time() - last_block_at, 1) if last_block_at else None,
+        },
+    })
+
+
+async def metrics_endpoint(request: Request):
+    """Prometheus text-format metrics"""
+    return PlainTextResponse(metrics.render(), media_type='text/plain; version=0.0.4')
 
-@app.route('/', methods=['GET'])
-def index():
+
+async def index(request: Request):
     """Root endpoint with usage instructions"""
-    return '''
+    return HTMLResponse(f'''
     <html>
         <head><title>Simple Proxy Server</title></head>
         <body>
@@ -133,14 +1271,35 @@ def index():
             <p>This is a simple proxy server for making HTTP requests.</p>
             <h2>Usage:</h2>
             <code>GET /proxy?url=https://example.com</code>
+            <h2>Batch (newline-delimited JSON results, in completion order):</h2>
+            <code>POST /batch {{"urls": ["https://example.com/a", "https://example.com/b"]}}</code>
             <h2>Health Check:</h2>
             <code>GET /health</code>
-            <p>Rate Limit: 10 requests per minute</p>
+            <h2>Metrics (Prometheus text format):</h2>
+            <code>GET /metrics</code>
+            <h2>Forward proxy:</h2>
+            <p>{f'Standard HTTP proxy (with HTTPS CONNECT) on port {FORWARD_PROXY_PORT}'
+                if FORWARD_PROXY_PORT else 'Disabled (set FORWARD_PROXY_PORT to enable)'}</p>
+            <p>Rate Limit: {MAX_REQUESTS_PER_MINUTE} requests per minute per target host
+               (burst {RATE_LIMIT_BURST}); requests over the limit wait up to {RATE_LIMIT_MAX_WAIT:.0f}s</p>
         </body>
     </html>
-    '''
+    ''')
+
+
+app = Starlette(
+    routes=[
+        Route('/proxy', proxy, methods=['GET', 'POST']),
+        Route('/batch', batch, methods=['POST']),
+        Route('/health', health, methods=['GET']),
+        Route('/metrics', metrics_endpoint, methods=['GET']),
+        Route('/', index, methods=['GET']),
+    ],
+    lifespan=lifespan,
+)
+app.add_middleware(MetricsMiddleware)
 
 if __name__ == '__main__':
-    import os
+    import uvicorn
     port = int(os.environ.get('PORT', 8000))
-    app.run(host='0.0.0.0', port=port, debug=False)
+    uvicorn.run(app, host='0.0.0.0', port=port)
@@ -0,0 +1,167 @@
+"""
+Per-stage timing for scrape runs
+Stages are wrapped in span("name") (or decorated with @timed("name")). Spans
+nest and each stage is charged its self time, so the stages of a run add up
+to its wall time; time outside any span is reported as "other". Every run's
+breakdown is appended to SCRAPE_TIMING_LOG as one JSON line.
+
+The current run is a context variable, so concurrent runs (e.g. Streamlit
+sessions, each on its own thread) stay separate. Worker threads join their
+caller's run when started with contextvars.copy_context().run.
+
+Usage:
+    python stage_timing.py            # table for the last logged run
+"""
+
+import argparse
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime
+
+SCRAPE_TIMING_LOG = os.getenv("SCRAPE_TIMING_LOG", "scrape_timings.jsonl")
+
+_local = threading.local()
+_current = contextvars.ContextVar("stage_timing_run", default=None)
+
+
+class RunTimer:
+    """Stage totals for one run; spans from worker threads that share its context are added too"""
+
+    def __init__(self, name, **meta):
+        self.name = name
+        self.meta = meta
+        self.started_at = datetime.now().isoformat(timespec="seconds")
+        self.started = time.perf_counter()
+        self.finished = None
+        self.lock = threading.Lock()
+        self.stages = {}
+
+    def record(self, stage, seconds, self_seconds):
+        with self.lock:
+            entry = self.stages.setdefault(stage, {"calls": 0, "seconds": 0.0, "self_seconds": 0.0})
+            entry["calls"] += 1
+            entry["seconds"] += seconds
+            entry["self_seconds"] += self_seconds
+
+    def breakdown(self):
+        wall = (self.finished or time.perf_counter()) - self.started
+        with self.lock:
+            stages = {
+                stage: {key: round(value, 4) if isinstance(value, float) else value for key, value in entry.items()}
+                for stage, entry in sorted(self.stages.items(), key=lambda item: -item[1]["self_seconds"])
+            }
+        accounted = sum(entry["self_seconds"] for entry in stages.values())
+        return {
+            "run": self.name,
+            **self.meta,
+            "started_at": self.started_at,
+            "wall_seconds": round(wall, 4),
+            "stages": stages,
+            # Negative only when worker threads overlap; their stages then sum past the wall time
+            "other_seconds": round(wall - accounted, 4),
+        }
+
+
+@contextmanager
+def span(stage):
+    """Charge the time spent in this block to `stage` of the current run"""
+    run = _current.get()
+    if run is None:
+        yield
+        return
+    stack = getattr(_local, "stack", None)
+    if stack is None:
+        stack = _local.stack = []
+    frame = [0.0]  # time spent in nested spans
+    stack.append(frame)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        stack.pop()
+        if stack:
+            stack[-1][0] += elapsed
+        run.record(stage, elapsed, elapsed - frame[0])
+
+
+def timed(stage):
+    """Decorator form of span()"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+@contextmanager
+def timed_run(name, log_path=SCRAPE_TIMING_LOG, **meta):
+    """
+    Time a run: logs its breakdown and prints a summary table at the end.
+    Yields the RunTimer; its breakdown() after the block is the run's final
+    breakdown. Inside a run that is already being timed, this is just a span
+    and yields the enclosing run.
+    """
+    outer = _current.get()
+    if outer is not None:
+        with span(name):
+            yield outer
+        return
+
+    run = RunTimer(name, **meta)
+    token = _current.set(run)
+    try:
+        yield run
+    finally:
+        _current.reset(token)
+        run.finished = time.perf_counter()
+        breakdown = run.breakdown()
+        if log_path:
+            try:
+                with open(log_path, "a", encoding="utf-8") as fh:
+                    fh.write(json.dumps(breakdown) + "\n")
+            except OSError as err:
+                print(f"Could not write timing log: {err}")
+        print(format_table(breakdown))
+
+
+def format_table(breakdown):
+    wall = breakdown["wall_seconds"] or 1e-9
+    lines = [
+        f"Timing for {breakdown['run']} ({breakdown['wall_seconds']:.1f}s wall)",
+        f"{'stage':<24}{'calls':>8}{'self s':>11}{'total s':>11}{'share':>8}",
+    ]
+    for stage, entry in breakdown["stages"].items():
+        lines.append(
+            f"{stage:<24}{entry['calls']:>8}{entry['self_seconds']:>11.2f}{entry['seconds']:>11.2f}"
+            f"{entry['self_seconds'] / wall:>8.1%}"
+        )
+    other = breakdown["other_seconds"]
+    lines.append(f"{'other':<24}{'':>8}{other:>11.2f}{'':>11}{other / wall:>8.1%}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("log", nargs="?", default=SCRAPE_TIMING_LOG)
+    parser.add_argument("--runs", type=int, default=1, help="How many of the latest runs to show")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.log):
+        raise SystemExit(f"No timing log at {args.log}")
+    with open(args.log, encoding="utf-8") as fh:
+        runs = [json.loads(line) for line in fh if line.strip()]
+    for breakdown in runs[-args.runs:]:
+        print(format_table(breakdown))
+        print()
+
+
+if __name__ == "__main__":
+    main()
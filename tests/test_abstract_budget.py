@@ -0,0 +1,76 @@
+import pytest
+
+import google_scholar_scraper as scraper
+from proxy_accounting import ProxyAccountant
+
+
+class FakeFleet:
+    def __init__(self):
+        self.requested = []
+
+    def iter_batch(self, urls, fetch_batch):
+        self.requested.append(list(urls))
+        for url in urls:
+            yield "node", {"url": url, "status": 200, "body": "<div id='gsc_oci_descr'>abstract</div>", "bytes": 1234}
+
+
+@pytest.fixture
+def fleet(tmp_path, monkeypatch):
+    fleet = FakeFleet()
+    monkeypatch.setattr(scraper, "USE_PROXY_BATCH", True)
+    monkeypatch.setattr(scraper, "LOCAL_PROXY_URL", "http://node")
+    monkeypatch.setattr(scraper, "PROXY_BATCH_CHUNK", 2)
+    monkeypatch.setattr(scraper, "ABSTRACT_PRIORITY", "citations")
+    monkeypatch.setattr(scraper, "get_proxy_fleet", lambda: fleet)
+    accountant = ProxyAccountant(str(tmp_path / "usage.db"))
+    monkeypatch.setattr(scraper, "get_accountant", lambda: accountant)
+    monkeypatch.setattr(scraper, "ghum", lambda *args: None)
+
+    def no_direct_fetch(session, url):
+        raise AssertionError(f"fetched {url} outside the batch")
+    monkeypatch.setattr(scraper, "fetch_abstract_from_detail", no_direct_fetch)
+    return fleet
+
+
+def pubs(n):
+    return [
+        {"Title": f"Paper {i}", "Citation Count": i,
+         "Scholar URL": f"https://scholar.google.com/citations?view_op=view_citation&citation_for_view=A:{i}"}
+        for i in range(n)
+    ]
+
+
+def test_batch_respects_request_budget_and_priority(fleet, monkeypatch):
+    monkeypatch.setattr(scraper, "ABSTRACT_REQUEST_BUDGET", 3)
+    stored = []
+    pending = scraper.fetch_details(None, pubs(6), True, stored.append)
+
+    assert [len(chunk) for chunk in fleet.requested] == [2, 1]
+    fetched = [pub["Title"] for pub in stored if pub["Abstract"] != scraper.SKIPPED_ABSTRACT]
+    assert fetched == ["Paper 5", "Paper 4", "Paper 3"]
+    assert sorted(pub["Title"] for pub in pending) == ["Paper 0", "Paper 1", "Paper 2"]
+    token = scraper.encode_continuation(pending)
+    assert scraper.decode_continuation(token) == {"A:0", "A:1", "A:2"}
+    # The node's raw byte count is accounted, not the length of the decoded body
+    usage = scraper.get_accountant().conn.execute(
+        "SELECT requests, bytes FROM usage WHERE provider = 'local_proxy'"
+    ).fetchone()
+    assert usage == (3, 3 * 1234)
+
+
+def test_batch_stops_at_the_time_budget(fleet, monkeypatch):
+    monkeypatch.setattr(scraper, "ABSTRACT_REQUEST_BUDGET", 0)
+    monkeypatch.setattr(scraper, "ABSTRACT_TIME_BUDGET", 60)
+    now = [0.0]
+    monkeypatch.setattr(scraper.time, "monotonic", lambda: now[0])
+    iter_batch = fleet.iter_batch
+
+    def slow_batch(urls, fetch_batch):
+        now[0] += 40
+        return iter_batch(urls, fetch_batch)
+    monkeypatch.setattr(fleet, "iter_batch", slow_batch)
+    stored = []
+    pending = scraper.fetch_details(None, pubs(6), True, stored.append)
+
+    assert len(fleet.requested) == 2
+    assert len(pending) == 2 and len(stored) == 6
@@ -0,0 +1,75 @@
+from citation_history import CitationHistory
+
+
+def rows(counts):
+    return [
+        {"Scholar URL": f"https://scholar.google.com/citations?view_op=view_citation&citation_for_view=A:{cid}",
+         "Title": f"Paper {cid}", "Citation Count": count}
+        for cid, count in counts.items()
+    ]
+
+
+def make_history(tmp_path):
+    history = CitationHistory(str(tmp_path / "history.db"))
+    history.record_snapshot("A", rows({"p1": 100, "p2": 40}), "2026-01-10")
+    history.record_snapshot("A", rows({"p1": 110, "p2": 40, "p3": 7}), "2026-01-20")
+    history.record_snapshot("A", rows({"p1": 115, "p2": 45, "p3": 9}), "2026-01-30")
+    return history
+
+
+def test_baseline_snapshot_inside_window_is_not_growth(tmp_path):
+    history = make_history(tmp_path)
+    # Window covers the author's first snapshot: counts at first sight are the baseline
+    assert history.paper_growth("A:p1", "2026-01-01", "2026-01-31") == 15
+    assert history.paper_growth("A:p2", "2026-01-01", "2026-01-31") == 5
+    # p3 first appears on the 20th with 7 citations and gains 2 after that
+    assert history.paper_growth("A:p3", "2026-01-01", "2026-01-31") == 2
+
+    growth = history.author_growth("A", "2026-01-01", "2026-01-31")
+    assert growth["total"] == 15 + 5 + 2
+    history.close()
+
+
+def test_paper_and_author_growth_agree(tmp_path):
+    history = make_history(tmp_path)
+    for start, end in [("2026-01-01", "2026-01-31"), ("2026-01-10", "2026-01-31"),
+                       ("2026-01-15", "2026-01-25"), ("2026-01-20", "2026-01-30")]:
+        growth = history.author_growth("A", start, end)
+        per_paper = {paper["cid"]: paper["gained"] for paper in growth["top"]}
+        for cid in ("A:p1", "A:p2", "A:p3"):
+            assert per_paper.get(cid, 0) == history.paper_growth(cid, start, end), (cid, start, end)
+        assert growth["total"] == sum(per_paper.values())
+    history.close()
+
+
+def test_growth_after_start_snapshot(tmp_path):
+    history = make_history(tmp_path)
+    assert history.paper_growth("A:p1", "2026-01-10", "2026-01-30") == 15
+    assert history.author_growth("A", "2026-01-20", "2026-01-30")["total"] == 5 + 5 + 2
+    history.close()
+
+
+def test_rows_from_other_profiles_are_not_recorded(tmp_path):
+    history = make_history(tmp_path)
+    # B's snapshot carries some of A's rows (e.g. from a shared CSV) plus its own
+    mixed = rows({"p1": 500, "p2": 600}) + [
+        {"Scholar URL": "https://scholar.google.com/citations?view_op=view_citation&citation_for_view=B:q1",
+         "Title": "B's paper", "Citation Count": 3},
+    ]
+    assert history.record_snapshot("B", mixed, "2026-02-01") == 1
+    assert history.count_at("A:p1", "2026-02-02") == 115
+    assert history.author_growth("A", "2026-01-01", "2026-02-02")["total"] == 15 + 5 + 2
+    assert history.conn.execute("SELECT author_id FROM publications WHERE cid = 'A:p1'").fetchone() == ("A",)
+    history.close()
+
+
+def test_existing_publication_keeps_its_author(tmp_path):
+    history = make_history(tmp_path)
+    # A publication already owned by B (e.g. recorded before rows were checked against their profile)
+    with history.conn:
+        history.conn.execute("INSERT INTO publications VALUES ('A:p9', 'B', 'Shared', 4, '2026-01-01T00:00:00')")
+    assert history.record_snapshot("A", rows({"p1": 120, "p9": 50}), "2026-02-01") == 1
+    owner = history.conn.execute("SELECT author_id, last_count FROM publications WHERE cid = 'A:p9'").fetchone()
+    assert owner == ("B", 4)
+    assert history.series("A:p9") == []
+    history.close()
@@ -0,0 +1,53 @@
+import pandas as pd
+import pytest
+
+import google_scholar_scraper as scraper
+from benchmarks.synthetic import SyntheticProfile, SyntheticSession
+from proxy_accounting import ProxyAccountant
+from publication_keys import owned_by
+
+
+@pytest.fixture
+def csv_path(tmp_path, monkeypatch):
+    # History, timing and usage files default to relative paths
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(scraper, "ghum", lambda *args: None)
+    accountant = ProxyAccountant(str(tmp_path / "usage.db"))
+    monkeypatch.setattr(scraper, "get_accountant", lambda: accountant)
+    return str(tmp_path / "results.csv")
+
+
+def delta(profile, csv_path):
+    return scraper.scrape_author(
+        SyntheticSession(profile), profile.user, 1990, 2025, False, csv_path, sync_mode="delta"
+    )
+
+
+def test_delta_sync_returns_and_rewrites_only_the_scraped_author(csv_path):
+    a = SyntheticProfile(6, seed=1, user="AAAAAAAAAAAJ")
+    b = SyntheticProfile(10, seed=2, user="BBBBBBBBBBBJ")
+    delta(a, csv_path)
+    before = pd.read_csv(csv_path, keep_default_na=False).to_dict(orient="records")
+
+    rows, stats, _ = delta(b, csv_path)
+    assert len(rows) == 10 and all(owned_by(row, b.user) for row in rows)
+    assert stats["added"] == 10
+
+    stored = pd.read_csv(csv_path, keep_default_na=False).to_dict(orient="records")
+    assert len(stored) == 16
+    assert [row for row in stored if owned_by(row, a.user)] == before
+
+
+def test_unchanged_rows_with_blank_or_na_fields_stay_unchanged(csv_path):
+    a = SyntheticProfile(6, seed=1, user="AAAAAAAAAAAJ")
+    delta(a, csv_path)
+    # Listing fields the scraper writes as "N/A" or "" must compare equal after a CSV round trip
+    df = pd.read_csv(csv_path, keep_default_na=False)
+    df.loc[0, "Venue"] = "N/A"
+    df.loc[1, "Venue"] = ""
+    df.to_csv(csv_path, index=False)
+
+    _, stats, _ = delta(a, csv_path)
+    assert stats["updated"] == 2 and stats["unchanged"] == 4
+    _, stats, _ = delta(a, csv_path)
+    assert stats == {"added": 0, "updated": 0, "unchanged": 6}
@@ -0,0 +1,68 @@
+import requests
+
+import google_scholar_scraper as scraper
+from proxy_accounting import ProxyAccountant, usage_run
+
+PAGE = (
+    b"<html><head>" + b"<meta>" * 500 + b"</head><body><div id='gsc_oci_table'>"
+    b"<div class='gs_scl'><div class='gsc_oci_field'>Description</div>"
+    b"<div class='gsc_oci_value' id='gsc_oci_descr'>The abstract.</div></div>"
+    b"<div class='gs_scl'><div class='gsc_oci_field'>Total citations</div></div>"
+    b"</div>" + b"<p>related</p>" * 500 + b"</body></html>"
+)
+URL = "https://scholar.google.com/citations?view_op=view_citation&citation_for_view=A:1"
+
+
+class RawBody:
+    """urllib3-like raw stream that can drop the connection after reset_after bytes"""
+
+    def __init__(self, body, reset_after=None):
+        self.body = body
+        self.pos = 0
+        self.reset_after = reset_after
+
+    def read(self, n=-1, **kwargs):
+        if self.reset_after is not None and self.pos >= self.reset_after:
+            raise requests.exceptions.ChunkedEncodingError("Connection reset by peer")
+        chunk = self.body[self.pos:self.pos + n]
+        self.pos += len(chunk)
+        return chunk
+
+    def tell(self):
+        return self.pos
+
+    def close(self):
+        pass
+
+
+class FlakySession:
+    def __init__(self, resets):
+        self.resets = list(resets)
+        self.calls = 0
+
+    def get(self, url, params=None, timeout=None, stream=False):
+        self.calls += 1
+        res = requests.Response()
+        res.status_code = 200
+        res.url = url
+        res.encoding = "utf-8"
+        res.raw = RawBody(PAGE, self.resets.pop(0) if self.resets else None)
+        return res
+
+
+def test_reset_mid_body_is_retried_and_accounted(tmp_path, monkeypatch):
+    accountant = ProxyAccountant(str(tmp_path / "usage.db"))
+    monkeypatch.setattr(scraper, "get_accountant", lambda: accountant)
+    monkeypatch.setattr(scraper.time, "sleep", lambda seconds: None)
+    session = FlakySession(resets=[1024])
+
+    with usage_run("A") as run:
+        html = scraper.stream_detail_page(session, URL, chunk_size=512)
+
+    assert session.calls == 2
+    assert scraper.parse_abstract_html(html) == "The abstract."
+    usage = run.usage[("direct", "detail")]
+    assert usage["requests"] == 2 and usage["retries"] == 1
+    # The failed attempt's kilobyte counts, and the second stopped before the related-articles tail
+    assert usage["bytes"] >= 1024 + PAGE.index(b"Total citations")
+    assert usage["bytes"] < 1024 + len(PAGE)
@@ -0,0 +1,83 @@
+import asyncio
+
+import httpx
+import pytest
+
+import simple_proxy_server as sps
+
+
+def upstream(request):
+    # No Content-Length: the proxy has to frame the body itself
+    return httpx.Response(200, headers={'content-type': 'text/html'}, stream=httpx.ByteStream(b'<html>ok</html>'))
+
+
+async def forward(raw_request):
+    server = await asyncio.start_server(sps.handle_forward_client, '127.0.0.1', 0)
+    port = server.sockets[0].getsockname()[1]
+    try:
+        reader, writer = await asyncio.open_connection('127.0.0.1', port)
+        writer.write(raw_request)
+        await writer.drain()
+        data = await asyncio.wait_for(reader.read(), 10)
+        writer.close()
+        return data
+    finally:
+        server.close()
+        await server.wait_closed()
+
+
+@pytest.fixture(autouse=True)
+def offline_upstream(monkeypatch):
+    async def no_wait(host, caller):
+        return 0.0
+
+    monkeypatch.setattr(sps.random, 'uniform', lambda a, b: 0)
+    monkeypatch.setattr(sps.rate_limiter, 'acquire', no_wait)
+    monkeypatch.setattr(sps, 'response_cache', sps.ResponseCache(60, 64))
+    monkeypatch.setattr(sps, 'upstream_client', httpx.AsyncClient(transport=httpx.MockTransport(upstream)))
+
+
+@pytest.mark.parametrize('target', [
+    'http://169.254.169.254/latest/meta-data/',
+    'http://127.0.0.1:8000/health',
+    'http://10.0.0.5/',
+])
+def test_private_destinations_are_refused(target):
+    data = asyncio.run(forward(f'GET {target} HTTP/1.1\r\nHost: x\r\nConnection: close\r\n\r\n'.encode()))
+    assert data.startswith(b'HTTP/1.1 403')
+
+
+def test_connect_to_metadata_service_is_refused():
+    data = asyncio.run(forward(b'CONNECT 169.254.169.254:443 HTTP/1.1\r\nHost: x\r\n\r\n'))
+    assert data.startswith(b'HTTP/1.1 403')
+
+
+def test_http10_client_gets_close_delimited_body(monkeypatch):
+    monkeypatch.setattr(sps, 'FORWARD_PROXY_ALLOW_PRIVATE', True)
+    data = asyncio.run(forward(b'GET http://127.0.0.1:9/page HTTP/1.0\r\nConnection: keep-alive\r\n\r\n'))
+    head, _, body = data.partition(b'\r\n\r\n')
+    assert head.startswith(b'HTTP/1.1 200')
+    assert b'transfer-encoding' not in head.lower()
+    assert b'Connection: close' in head
+    assert body == b'<html>ok</html>'
+
+
+def test_http11_client_gets_chunked_body(monkeypatch):
+    monkeypatch.setattr(sps, 'FORWARD_PROXY_ALLOW_PRIVATE', True)
+    data = asyncio.run(forward(b'GET http://127.0.0.1:9/page HTTP/1.1\r\nConnection: close\r\n\r\n'))
+    head, _, body = data.partition(b'\r\n\r\n')
+    assert b'Transfer-Encoding: chunked' in head
+    assert body == b'f\r\n<html>ok</html>\r\n0\r\n\r\n'
+
+
+def test_open_proxy_on_public_interface_refuses_to_start(monkeypatch):
+    monkeypatch.setattr(sps, 'FORWARD_PROXY_PORT', 18080)
+    monkeypatch.setattr(sps, 'FORWARD_PROXY_HOST', '0.0.0.0')
+    monkeypatch.setattr(sps, 'FORWARD_PROXY_AUTH', '')
+
+    async def start():
+        async with sps.lifespan(sps.app):
+            pass
+
+    with pytest.raises(RuntimeError, match='open forward proxy'):
+        asyncio.run(start())
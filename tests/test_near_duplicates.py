@@ -0,0 +1,69 @@
+import json
+
+import pytest
+
+from near_duplicates import merge_near_duplicates
+
+
+def row(title, authors="A Vaswani, N Shazeer, N Parmar", venue="NeurIPS", citations=10, pub="x"):
+    return {
+        "Title": title, "Authors": authors, "Venue": venue, "Citation Count": citations,
+        "Scholar URL": f"https://scholar.google.com/citations?view_op=view_citation&citation_for_view=A:{pub}",
+    }
+
+
+@pytest.mark.parametrize("first, second", [
+    ("Deep learning for protein folding, Part I: foundations",
+     "Deep learning for protein folding, Part II: foundations"),
+    ("Proceedings of the 2023 workshop on scholarly document processing",
+     "Proceedings of the 2024 workshop on scholarly document processing"),
+    ("Evaluating GPT-3 on clinical question answering",
+     "Evaluating GPT-4 on clinical question answering"),
+    ("Attention is all you need",
+     "Attention is not all you need"),
+    ("A large-scale study of sparse attention in long-document transformer language models",
+     "A large-scale study of sparse attention in long-document transformer language models without pretraining"),
+])
+def test_different_papers_are_not_merged(first, second):
+    kept, merged = merge_near_duplicates([row(first, pub="a"), row(second, pub="b")])
+    assert merged == 0
+    assert [r["Title"] for r in kept] == [first, second]
+
+
+def test_different_paper_is_not_merged_into_existing_row():
+    existing = [row("Evaluating GPT-3 on clinical question answering", pub="a")]
+    kept, merged = merge_near_duplicates([row("Evaluating GPT-4 on clinical question answering", pub="b")], existing)
+    assert merged == 0 and len(kept) == 1
+    assert "Aliases" not in existing[0]
+
+
+def test_preprint_is_merged_into_published_version_as_alias():
+    published = row("Attention Is All You Need", citations=90000, pub="pub")
+    preprint = row("Attention is all you need.", venue="arXiv preprint arXiv:1706.03762", citations=1200, pub="pre")
+    kept, merged = merge_near_duplicates([preprint, published])
+
+    assert merged == 1
+    assert kept == [published]
+    assert published["Citation Count"] == 90000
+    assert json.loads(published["Aliases"]) == [
+        {"Title": preprint["Title"], "Scholar URL": preprint["Scholar URL"], "Citation Count": 1200}
+    ]
+
+
+def test_candidate_matching_stored_row_is_recorded_on_it():
+    stored = row("Attention is all you need", citations=5, pub="old")
+    existing = [stored]
+    variant = row("Attention is all you need!", citations=7, pub="new")
+
+    kept, merged = merge_near_duplicates([variant], existing)
+    assert kept == [] and merged == 1
+    # The stored row keeps its own count; the variant's belongs to another citation ID
+    assert stored["Citation Count"] == 5
+    assert json.loads(stored["Aliases"]) == [
+        {"Title": variant["Title"], "Scholar URL": variant["Scholar URL"], "Citation Count": 7}
+    ]
+
+    # The same variant on the next run is not recorded twice, but its count is refreshed
+    merge_near_duplicates([dict(variant, **{"Citation Count": 9})], existing)
+    assert [alias["Citation Count"] for alias in json.loads(stored["Aliases"])] == [9]
+    assert stored["Citation Count"] == 5
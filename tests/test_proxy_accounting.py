@@ -0,0 +1,74 @@
+import threading
+
+import httpx
+import pytest
+
+import proxy_accounting
+from proxy_accounting import BudgetExceeded, ProxyAccountant, current_run, response_hook, usage_run
+
+
+@pytest.fixture
+def accountant(tmp_path, monkeypatch):
+    accountant = ProxyAccountant(str(tmp_path / "usage.db"))
+    monkeypatch.setattr(proxy_accounting, "_accountant", accountant)
+    return accountant
+
+
+def test_concurrent_runs_are_accounted_separately(accountant):
+    runs = {}
+    both_started = threading.Barrier(2)
+
+    def session(author, requests):
+        with usage_run(author) as run:
+            both_started.wait()
+            for _ in range(requests):
+                accountant.record("decodo", "detail", 1000)
+            both_started.wait()
+        runs[author] = run
+
+    threads = [threading.Thread(target=session, args=args) for args in (("A", 2), ("B", 5))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert runs["A"].usage[("decodo", "detail")]["requests"] == 2
+    assert runs["B"].usage[("decodo", "detail")]["requests"] == 5
+    assert runs["A"].run_id != runs["B"].run_id
+    assert current_run() is None
+
+
+def test_daily_budget_sees_spend_from_other_processes(accountant, tmp_path):
+    accountant.daily_budget = 1.0
+    accountant.check_budget("scraperapi")
+    # Another process (its own connection) spends the rest of today's budget
+    other = ProxyAccountant(str(tmp_path / "usage.db"))
+    for _ in range(3):
+        other.record("scraperapi", "detail", 0, billable=True)
+    other.conn.execute("UPDATE usage SET cost = 2.0")
+    other.conn.commit()
+
+    with pytest.raises(BudgetExceeded, match="daily"):
+        accountant.check_budget("scraperapi")
+
+
+def test_run_budget_applies_to_the_current_run_only(accountant):
+    with usage_run("A", budget=0.001):
+        accountant.record("scraperapi", "detail", 0)
+        accountant.record("scraperapi", "detail", 0)
+        accountant.record("scraperapi", "detail", 0)
+        with pytest.raises(BudgetExceeded, match="run"):
+            accountant.check_budget("scraperapi")
+    with usage_run("B", budget=0.001):
+        accountant.check_budget("scraperapi")
+
+
+def test_httpx_response_hook_records_against_the_run(accountant):
+    body = b"x" * 5000
+    transport = httpx.MockTransport(lambda request: httpx.Response(200, stream=httpx.ByteStream(body)))
+    client = httpx.Client(transport=transport, event_hooks={"response": [response_hook("decodo")]})
+    with usage_run("A") as run:
+        response = client.get("https://scholar.google.com/citations?view_op=view_citation&citation_for_view=A:1")
+    assert response.content == body
+    entry = run.usage[("decodo", "detail")]
+    assert entry["requests"] == 1 and entry["bytes"] >= len(body)
@@ -0,0 +1,93 @@
+import gzip
+import json
+
+import httpx
+import pytest
+import requests
+from starlette.testclient import TestClient
+
+import google_scholar_scraper as scraper
+import simple_proxy_server as sps
+
+PAGE = b'<html><body>' + b'<div class="gsc_oci_value">abstract</div>' * 200 + b'</body></html>'
+
+
+class TruncatedStream(httpx.AsyncByteStream):
+    """Sends part of the body, then fails the way httpx reports a short read"""
+
+    def __init__(self, body):
+        self.body = body
+
+    async def __aiter__(self):
+        yield self.body[:len(self.body) // 3]
+        raise httpx.RemoteProtocolError('peer closed connection without sending complete message body')
+
+
+def upstream(request):
+    body = gzip.compress(PAGE)
+    if request.url.params.get('n', '0') in ('2', '5', '9'):
+        return httpx.Response(200, headers={'content-encoding': 'gzip'}, stream=TruncatedStream(body))
+    return httpx.Response(200, headers={'content-encoding': 'gzip'}, stream=httpx.ByteStream(body))
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def no_wait(host, caller):
+        return 0.0
+
+    monkeypatch.setattr(sps.random, 'uniform', lambda a, b: 0)
+    monkeypatch.setattr(sps.rate_limiter, 'acquire', no_wait)
+    monkeypatch.setattr(sps, 'response_cache', sps.ResponseCache(60, 64))
+    monkeypatch.setattr(sps, 'upstream_client', httpx.AsyncClient(transport=httpx.MockTransport(upstream)))
+    return TestClient(sps.app)
+
+
+def test_truncated_upstream_body_becomes_an_error_record(client):
+    urls = [f'https://scholar.google.com/citations?n={n}' for n in range(12)]
+    response = client.post('/batch', json={'urls': urls})
+
+    assert response.status_code == 200
+    records = [json.loads(line) for line in response.text.splitlines()]
+    assert sorted(r['index'] for r in records) == list(range(12))
+
+    failed = {r['index'] for r in records if 'error' in r}
+    assert failed == {2, 5, 9}
+    for record in records:
+        if record['index'] in failed:
+            assert record['status'] == 502
+            assert record['url'] == urls[record['index']]
+        else:
+            assert record['status'] == 200
+            assert 'gsc_oci_value' in record['body']
+            assert record['bytes'] == len(gzip.compress(PAGE))
+
+    assert sps.response_cache.inflight == {}
+    assert len(sps.response_cache.entries) == 9
+
+
+def test_failed_proxy_fetch_releases_in_flight_slot(client, monkeypatch):
+    def refuse(request):
+        raise httpx.ConnectError('connection refused')
+
+    monkeypatch.setattr(sps, 'upstream_client', httpx.AsyncClient(transport=httpx.MockTransport(refuse)))
+    response = client.get('/proxy', params={'url': 'https://scholar.google.com/citations?n=1'})
+
+    assert response.status_code == 500
+    assert sps.response_cache.inflight == {}
+
+
+def test_batch_error_response_releases_the_connection(monkeypatch):
+    # Client side: iter_proxy_batch must close a non-2xx /batch response
+    closed = []
+
+    def post(url, **kwargs):
+        res = requests.Response()
+        res.status_code = 503
+        res.url = url
+        res.close = lambda: closed.append(url)
+        return res
+    monkeypatch.setattr(scraper.requests, 'post', post)
+
+    with pytest.raises(requests.HTTPError):
+        list(scraper.iter_proxy_batch('http://node', ['https://scholar.google.com/citations?n=1']))
+    assert closed == ['http://node/batch']
@@ -0,0 +1,117 @@
+import threading
+
+import pytest
+
+import proxy_fleet
+from proxy_fleet import ProxyFleet
+
+
+def make_fleet(loads, strategy="least_loaded"):
+    """Fleet whose /health reports come from `loads` ({node: load or None for down})"""
+    fleet = ProxyFleet(list(loads), strategy=strategy)
+
+    def check_node(node):
+        load = loads[node]
+        return None if load is None else {"load": {"upstream_in_flight": load, "waiting": 0}}
+    fleet.check_node = check_node
+    return fleet
+
+
+def test_least_loaded_picks_the_idlest_node_and_counts_local_requests():
+    fleet = make_fleet({"a": 5, "b": 1, "c": 3})
+    assert fleet.choose() == "b"
+    with fleet.track("b"), fleet.track("b"), fleet.track("b"):
+        assert fleet.choose() == "c"
+    assert fleet.choose() == "b"
+
+
+def test_least_loaded_assign_balances_work():
+    fleet = make_fleet({"a": 0, "b": 2})
+    plan = fleet.assign([f"u{i}" for i in range(4)])
+    assert {node: len(urls) for node, urls in plan.items()} == {"a": 3, "b": 1}
+
+
+def test_down_node_is_skipped():
+    fleet = make_fleet({"a": 0, "b": None})
+    assert {fleet.choose() for _ in range(20)} == {"a"}
+
+
+def test_hash_strategy_is_stable_and_moves_only_the_excluded_nodes_urls():
+    fleet = make_fleet({"a": 0, "b": 0, "c": 0}, strategy="hash")
+    urls = [f"https://scholar.google.com/citations?p={i}" for i in range(60)]
+    plan = fleet.assign(urls)
+    owner = {url: node for node, batch in plan.items() for url in batch}
+    assert len(plan) == 3
+    assert all(fleet.choose(key=url) == owner[url] for url in urls)
+
+    without_a = fleet.assign(urls, exclude={"a"})
+    assert "a" not in without_a
+    moved = {url: node for node, batch in without_a.items() for url in batch}
+    assert all(moved[url] == owner[url] for url in urls if owner[url] != "a")
+
+
+@pytest.mark.parametrize("record", ["record_block", "record_failure"])
+def test_blocked_or_failed_node_sits_out_its_cooldown(record, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(proxy_fleet.time, "time", lambda: now[0])
+    fleet = make_fleet({"a": 0, "b": 5})
+    assert fleet.choose() == "a"
+
+    getattr(fleet, record)("a")
+    assert fleet.choose() == "b"
+    assert fleet.summary()["a"]["cooling_down_s"] > 0
+
+    cooldown = proxy_fleet.FLEET_BLOCK_COOLDOWN if record == "record_block" else proxy_fleet.FLEET_DOWN_COOLDOWN
+    now[0] += cooldown + 1
+    assert fleet.choose() == "a"
+
+
+def test_all_nodes_cooling_down_yields_nothing():
+    fleet = make_fleet({"a": 0})
+    fleet.record_block("a")
+    assert fleet.choose() is None
+    assert fleet.assign(["u"]) == {}
+
+
+def test_blocked_nodes_leftovers_move_to_the_other_nodes():
+    fleet = make_fleet({"a": 0, "b": 0, "c": 0})
+    urls = [f"u{i}" for i in range(9)]
+    calls = []
+    lock = threading.Lock()
+
+    def fetch_batch(node, batch):
+        with lock:
+            calls.append((node, list(batch)))
+        for i, url in enumerate(batch):
+            if node == "a" and i == 1:
+                # Block page on a's second URL: the rest of a's batch is never fetched
+                yield {"url": url, "status": 429, "blocked": True}
+                return
+            yield {"url": url, "status": 200}
+
+    results = list(fleet.iter_batch(urls, fetch_batch))
+
+    assert sorted(record["url"] for _, record in results) == urls
+    first_round_a = next(batch for node, batch in calls if node == "a")
+    # Only the page a fetched before the block counts as a's; the block page itself is not yielded
+    assert [record["url"] for node, record in results if node == "a"] == first_round_a[:1]
+    second_round = calls[3:]
+    assert second_round and all(node != "a" for node, _ in second_round)
+    assert sorted(url for _, batch in second_round for url in batch) == sorted(first_round_a[1:])
+    assert fleet.state["a"]["blocked"] == 1
+    assert fleet.choose() in ("b", "c")
+
+
+def test_failing_node_is_dropped_and_its_urls_retried_elsewhere():
+    fleet = make_fleet({"a": 0, "b": 0})
+    urls = [f"u{i}" for i in range(6)]
+
+    def fetch_batch(node, batch):
+        if node == "a":
+            raise ConnectionError("node unreachable")
+        return ({"url": url, "status": 200} for url in batch)
+
+    results = list(fleet.iter_batch(urls, fetch_batch))
+    assert sorted(record["url"] for _, record in results) == urls
+    assert {node for node, _ in results} == {"b"}
+    assert fleet.state["a"]["failure"] == 1
@@ -0,0 +1,25 @@
+import json
+
+import pytest
+
+pytest.importorskip("scholarly")
+from google_scholar_scrapper_scholarly import clear_checkpoint, load_checkpoint  # noqa: E402
+
+
+def write_entries(path, entries):
+    path.write_text("".join(json.dumps(entry) + "\n" for entry in entries), encoding="utf-8")
+
+
+def test_clean_run_keeps_other_authors_progress(tmp_path):
+    path = tmp_path / "checkpoint.jsonl"
+    write_entries(path, [
+        {"author_id": "A", "key": "a1", "row": {"title": "A1"}},
+        {"author_id": "B", "key": "b1", "row": {"title": "B1"}},
+        {"author_id": "A", "key": "a2", "row": None},
+    ])
+    clear_checkpoint(str(path), "A")
+    assert load_checkpoint(str(path), "A") == {}
+    assert load_checkpoint(str(path), "B") == {"b1": {"title": "B1"}}
+
+    clear_checkpoint(str(path), "B")
+    assert not path.exists()
@@ -0,0 +1,65 @@
+"""
+scholarly_parallel.py and app.py reach into private parts of scholarly
+(pinned in requirements.txt); these fail loudly if an upgrade moves them.
+"""
+import httpx
+import pytest
+
+scholarly = pytest.importorskip("scholarly")
+from scholarly import ProxyGenerator  # noqa: E402
+from scholarly._navigator import Navigator  # noqa: E402
+
+from scholarly_parallel import clone_scholarly_navigator  # noqa: E402
+
+
+def test_proxy_generator_attributes():
+    pg = ProxyGenerator()
+    assert isinstance(pg._proxies, dict)
+    assert pg._proxy_works is False
+    assert hasattr(pg, "proxy_mode")
+    assert isinstance(pg.get_session(), httpx.Client)
+
+
+def test_proxy_generator_builds_sessions_through_new_session():
+    built = []
+
+    class Hooked(ProxyGenerator):
+        def _new_session(self, **kwargs):
+            session = super()._new_session(**kwargs)
+            built.append(session)
+            return session
+
+    pg = Hooked()
+    assert built and pg.get_session() is built[-1]
+    assert isinstance(built[-1].event_hooks["response"], list)
+
+
+def test_navigator_attributes():
+    nav = Navigator()
+    for name in ("pm1", "pm2", "_session1", "_session2"):
+        assert hasattr(nav, name), name
+    assert callable(nav._new_session)
+
+
+def test_clone_has_its_own_clients():
+    base = Navigator()
+    nav = clone_scholarly_navigator()
+    assert nav is not base
+    assert nav._session1 is not base._session1 and nav._session2 is not base._session2
+    assert nav.pm1 is base.pm1
+    old = nav._session1
+    nav._new_session(premium=True)
+    assert nav._session1 is not old and base._session1 is not old
+
+
+def test_clone_keeps_the_sessions_event_hooks():
+    base = Navigator()
+    hook = lambda response: None  # noqa: E731
+    base._session1.event_hooks["response"].append(hook)
+    try:
+        nav = clone_scholarly_navigator()
+        assert hook in nav._session1.event_hooks["response"]
+        nav._new_session(premium=True)
+        assert hook in nav._session1.event_hooks["response"]
+    finally:
+        base._session1.event_hooks["response"].remove(hook)
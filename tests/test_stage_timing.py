@@ -0,0 +1,50 @@
+import contextvars
+import threading
+import time
+
+from stage_timing import span, timed_run
+
+
+def test_concurrent_runs_do_not_share_stages():
+    results = {}
+    both_started = threading.Barrier(2)
+
+    def session(name, stage):
+        with timed_run(name, log_path=None) as run:
+            both_started.wait()
+            with span(stage):
+                time.sleep(0.01)
+            both_started.wait()
+        results[name] = run.breakdown()
+
+    threads = [threading.Thread(target=session, args=(f"run{i}", f"stage{i}")) for i in range(2)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert list(results["run0"]["stages"]) == ["stage0"]
+    assert list(results["run1"]["stages"]) == ["stage1"]
+
+
+def work():
+    with span("worker"):
+        pass
+
+
+def test_worker_threads_join_the_callers_run_only_with_its_context():
+    with timed_run("outer", log_path=None) as run:
+        for target, args in ((contextvars.copy_context().run, (work,)), (work, ())):
+            worker = threading.Thread(target=target, args=args)
+            worker.start()
+            worker.join()
+    assert run.breakdown()["stages"]["worker"]["calls"] == 1
+
+
+def test_nested_run_is_a_span_of_the_outer_run():
+    with timed_run("outer", log_path=None) as outer:
+        with timed_run("inner", log_path=None) as inner:
+            with span("work"):
+                pass
+    assert inner is outer
+    assert set(outer.breakdown()["stages"]) == {"inner", "work"}